@@ -0,0 +1,467 @@
+# Offline benchmark for dashboard.py. Runs the dashboard's data and user
+# store code paths against an in-process fake BigQuery client backed by
+# synthetic tables, and reports latency percentiles, peak RSS and the bytes
+# that would be sent to the browser.
+#
+#   python benchmark.py
+#   python benchmark.py --rows 10000 100000 --users 10 1000 --json baseline.json
+#   python benchmark.py --json after.json --baseline baseline.json
+import argparse
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import resource
+import tempfile
+import time
+import types
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+
+import streamlit as st
+from streamlit import config as streamlit_config
+from streamlit import logger as streamlit_logger
+from streamlit import type_util
+
+# Synthetic table layout
+DATASET = "rawc_data"
+CATEGORIES = [f"category_{i}" for i in range(20)]
+LABELS = [f"label_{i:04d}" for i in range(1000)]
+USER_TABLES = 3  # Tables granted to each synthetic user
+
+# Aggregates the dashboard's column profile queries use
+AGGREGATE_PATTERN = re.compile(r"(COUNTIF|APPROX_COUNT_DISTINCT|MIN|MAX|APPROX_TOP_COUNT)\(`([^`]+)`[^)]*\) AS (\w+)")
+
+# Function to build a synthetic table as an Arrow table, in the shape BigQuery
+# returns results: plain (not dictionary-encoded) strings, int64 and float64
+def make_table(num_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2024-01-01T00:00:00", "us")
+    return pa.table({
+        "id": pa.array(np.arange(num_rows, dtype=np.int64)),
+        "category": pc.take(pa.array(CATEGORIES), pa.array(rng.integers(0, len(CATEGORIES), num_rows))),
+        "label": pc.take(pa.array(LABELS), pa.array(rng.integers(0, len(LABELS), num_rows))),
+        "quantity": pa.array(rng.integers(0, 500, num_rows, dtype=np.int64)),
+        "value": pa.array(rng.normal(100.0, 25.0, num_rows)),
+        "event_time": pa.array(start + np.arange(num_rows).astype("timedelta64[s]"), pa.timestamp("us", tz="UTC")),
+    })
+
+# Result of a fake query job or list_rows call
+class FakeRowIterator:
+    def __init__(self, table):
+        self._table = table
+        self.total_rows = table.num_rows
+        self.schema = [bigquery.SchemaField(field.name, bigquery_type(field.type)) for field in table.schema]
+
+    def to_arrow(self, **kwargs):
+        return self._table
+
+    def to_dataframe(self, **kwargs):
+        return self._table.to_pandas()
+
+    def to_arrow_iterable(self, **kwargs):
+        yield from self._table.to_batches(max_chunksize=10000)
+
+    def to_dataframe_iterable(self, **kwargs):
+        for batch in self.to_arrow_iterable():
+            yield batch.to_pandas()
+
+    def __iter__(self):
+        return iter(self._table.to_pylist())
+
+class FakeQueryJob:
+    def __init__(self, table, latency):
+        self._table = table
+        self._latency = latency
+        self.destination = table  # list_rows reads pages straight from it
+
+    def result(self, **kwargs):
+        time.sleep(self._latency)
+        return FakeRowIterator(self._table)
+
+    def to_arrow(self, **kwargs):
+        return self.result().to_arrow()
+
+    def to_dataframe(self, **kwargs):
+        return self.result().to_dataframe()
+
+class FakeDryRunJob:
+    def __init__(self, total_bytes_processed):
+        self.total_bytes_processed = total_bytes_processed
+        self.statement_type = "SELECT"
+
+# In-process stand-in for bigquery.Client. Queries are answered from the
+# synthetic tables: the table in the FROM clause, cut to the LIMIT, or one row
+# of aggregates for column profile queries. WHERE clauses are not evaluated,
+# so timings cover the dashboard's own work, not BigQuery's.
+class FakeBigQueryClient:
+    def __init__(self, tables, latency=0.0):
+        self.project = "benchmark"
+        self.tables = tables
+        self.latency = latency
+        self.queries = 0
+
+    def dataset(self, dataset_id, project=None):
+        return bigquery.DatasetReference(project or self.project, dataset_id)
+
+    def list_datasets(self, project=None, max_results=None):
+        return [types.SimpleNamespace(dataset_id=DATASET)]
+
+    def get_dataset(self, dataset_ref):
+        if dataset_ref.dataset_id != DATASET:
+            raise NotFound(f"Dataset {dataset_ref.dataset_id} not found")
+        # The etag changes whenever tables are added or removed
+        etag = hashlib.sha256("\n".join(sorted(self.tables)).encode()).hexdigest()
+        return types.SimpleNamespace(reference=dataset_ref, etag=etag, modified=None)
+
+    def list_tables(self, dataset_ref):
+        return [types.SimpleNamespace(table_id=name) for name in self.tables]
+
+    def get_table(self, table_ref):
+        if table_ref.dataset_id != DATASET or table_ref.table_id not in self.tables:
+            raise NotFound(f"Table {table_ref.table_id} not found")
+        table = self.tables[table_ref.table_id]
+        return types.SimpleNamespace(
+            schema=FakeRowIterator(table.slice(0, 0)).schema,
+            num_rows=table.num_rows,
+            num_bytes=table.nbytes,
+            modified=None,
+            time_partitioning=None,
+            range_partitioning=None,
+            clustering_fields=None,
+        )
+
+    def query(self, query, job_config=None):
+        table = self._resolve(query)
+        if job_config is not None and job_config.dry_run:
+            return FakeDryRunJob(table.nbytes)
+        self.queries += 1
+        if AGGREGATE_PATTERN.search(query):
+            table = aggregate(table, query)
+        return FakeQueryJob(table, self.latency)
+
+    def list_rows(self, table, selected_fields=None, start_index=0, max_results=None):
+        return FakeRowIterator(table.slice(start_index, max_results))
+
+    def _resolve(self, query):
+        from_clause = query.split("FROM", 1)[1].split("`")[1]
+        table = self.tables[from_clause.split(".")[-1]]
+        if "LIMIT" in query:
+            table = table.slice(0, int(query.rsplit("LIMIT", 1)[1].split()[0]))
+        return table
+
+# Function to answer a column profile query with one row of aggregates
+def aggregate(table, query):
+    row = {}
+    for function, column, alias in AGGREGATE_PATTERN.findall(query):
+        values = table.column(column)
+        if function == "COUNTIF":
+            row[alias] = values.null_count
+        elif function == "APPROX_COUNT_DISTINCT":
+            row[alias] = pc.count_distinct(values).as_py()
+        elif function == "MIN":
+            row[alias] = pc.min(values).as_py()
+        elif function == "MAX":
+            row[alias] = pc.max(values).as_py()
+        else:
+            counts = sorted(pc.value_counts(values).to_pylist(), key=lambda c: -c["counts"])
+            row[alias] = [{"value": c["values"], "count": c["counts"]} for c in counts[:10]]
+    return pa.Table.from_pylist([row])
+
+# Function to map Arrow types to BigQuery field types for the fake schema
+def bigquery_type(arrow_type):
+    if pa.types.is_integer(arrow_type):
+        return "INT64"
+    if pa.types.is_floating(arrow_type):
+        return "FLOAT64"
+    if pa.types.is_timestamp(arrow_type):
+        return "TIMESTAMP"
+    return "STRING"
+
+# Attribute-style dict standing in for st.session_state outside `streamlit run`
+class SessionState(dict):
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __delattr__(self, key):
+        del self[key]
+
+# Counts the bytes st.dataframe would send to the browser
+class PayloadRecorder:
+    def __init__(self):
+        self.bytes = 0
+
+    def dataframe(self, data=None, *args, **kwargs):
+        if isinstance(data, pd.DataFrame):
+            self.bytes += len(type_util.data_frame_to_bytes(data))
+
+# Function to memoize an st.cache_data function outside `streamlit run`, where
+# it recomputes on every call. As with cache_data, arguments whose names start
+# with an underscore are not part of the key and callers get a copy.
+def memoize_data(fn):
+    parameters = list(inspect.signature(fn).parameters)
+    values = {}
+    
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        arguments = dict(zip(parameters, args), **kwargs)
+        key = repr([(name, value) for name, value in arguments.items() if not name.startswith("_")])
+        if key not in values:
+            values[key] = fn(*args, **kwargs)
+        return copy.deepcopy(values[key])
+    
+    wrapper.clear = values.clear
+    return wrapper
+
+# Function to import the dashboard with caching and session state that work
+# outside `streamlit run`: shared getters (st.cache_resource, no arguments)
+# return one instance per process, st.cache_data functions are memoized, and
+# session state is a plain dict
+def load_dashboard(store_backend):
+    # Streamlit warns on every cache and element call outside `streamlit run`
+    streamlit_config.set_option("global.showWarningOnDirectExecution", False)
+    streamlit_logger.set_log_level("error")
+    st.session_state = SessionState(authenticated=False, username="", role="")
+    import dashboard
+    for name, value in list(vars(dashboard).items()):
+        # Streamlit's cache decorators add a clear() to the wrapped function
+        wrapped = getattr(value, "__wrapped__", None)
+        if wrapped is None or not hasattr(value, "clear"):
+            continue
+        if name.startswith("get_") and not inspect.signature(wrapped).parameters:
+            setattr(dashboard, name, functools.cache(wrapped))
+        else:
+            setattr(dashboard, name, memoize_data(wrapped))
+    dashboard.USER_STORE_BACKEND = store_backend
+    return dashboard
+
+# Function to build a synthetic user table
+def make_users(num_users, table_names):
+    users = {
+        "admin": {
+            "password": hashlib.sha256(b"admin123").hexdigest(),
+            "role": "admin",
+            "data_access": {"tables": [], "row_filters": {}},
+        }
+    }
+    for i in range(num_users - 1):
+        tables = [f"{DATASET}.{table_names[(i + j) % len(table_names)]}" for j in range(min(USER_TABLES, len(table_names)))]
+        row_filter = f"quantity > {i % 100}"
+        users[f"user{i}"] = {
+            "password": hashlib.sha256(f"password{i}".encode()).hexdigest(),
+            "role": "user",
+            "data_access": {
+                "tables": tables,
+                "row_filters": {tables[0]: row_filter},
+                "compiled_filters": {tables[0]: {"source": row_filter, "predicate": row_filter}},
+            },
+        }
+    return users
+
+# Function to log in a session directly, without the login form
+def login(username, role):
+    st.session_state.authenticated = True
+    st.session_state.username = username
+    st.session_state.role = role
+
+# Function to time a callable. setup runs before each iteration and is not timed.
+def measure(name, size, fn, iterations, setup=None, payload=None):
+    samples = []
+    payload_bytes = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        if payload is not None:
+            payload.bytes = 0
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        if payload is not None:
+            payload_bytes.append(payload.bytes)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    result = {
+        "name": name,
+        "size": size,
+        "iterations": iterations,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        # Peak RSS of the process so far (ru_maxrss is in KB on Linux)
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "bytes_serialized": int(np.median(payload_bytes)) if payload_bytes else None,
+    }
+    print_result(result)
+    return result
+
+# Function to print one benchmark result line
+def print_result(result):
+    serialized = "" if result["bytes_serialized"] is None else f"{result['bytes_serialized']:>12,}"
+    print(
+        f"{result['name']:<40} {result['size']:>10,} "
+        f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} {result['p99_ms']:>10.2f} "
+        f"{result['peak_rss_mb']:>10.1f} {serialized}"
+    )
+
+# Benchmarks for the table query, filter and rendering paths at one table size
+def benchmark_tables(dashboard, client, num_rows, iterations, payload):
+    table_name = f"{DATASET}.rows_{num_rows}"
+    client.tables[f"rows_{num_rows}"] = make_table(num_rows)
+    dashboard.get_table_metadata_cache().invalidate(table_name)
+    dashboard.get_catalog().refresh(client, dashboard.CATALOG_SOURCES)
+    dashboard.save_user("bench_user", {
+        "password": hashlib.sha256(b"bench").hexdigest(),
+        "role": "user",
+        "data_access": {
+            "tables": [table_name],
+            "row_filters": {table_name: "quantity > 10"},
+            "compiled_filters": {table_name: {"source": "quantity > 10", "predicate": "quantity > 10"}},
+        },
+    })
+    clear_results = dashboard.get_result_cache().clear
+    results = []
+
+    login("admin", "admin")
+    results.append(measure(
+        "get_table_data admin, no limit (cold)", num_rows,
+        lambda: dashboard.get_table_data(table_name, row_limit=0), iterations, setup=clear_results
+    ))
+    results.append(measure(
+        "get_table_data admin, no limit (cached)", num_rows,
+        lambda: dashboard.get_table_data(table_name, row_limit=0), iterations
+    ))
+    df = dashboard.get_table_data(table_name, row_limit=0)
+
+    filters = {"category": CATEGORIES[:3], "value": (90.0, 110.0)}
+    results.append(measure(
+        "filters prepare (cold)", num_rows,
+        lambda: dashboard.FilterEngine(dashboard.FILTER_CACHE_FRAMES).prepare(df), iterations
+    ))
+    profile = dashboard.prepare_filter_frame(df)
+    results.append(measure(
+        "filters prepare (cached)", num_rows, lambda: dashboard.prepare_filter_frame(df), iterations
+    ))
+    results.append(measure(
+        "filters apply", num_rows, lambda: dashboard.apply_filters(profile, filters), iterations
+    ))
+    results.append(measure(
+        "render filtered table", num_rows,
+        lambda: dashboard.render_table(dashboard.apply_filters(profile, filters), "benchmark_table"),
+        iterations, payload=payload
+    ))
+
+    login("bench_user", "user")
+    results.append(measure(
+        "get_table_data user, limit 100 (cold)", num_rows,
+        lambda: dashboard.get_table_data(table_name, row_limit=dashboard.USER_DEFAULT_ROW_LIMIT),
+        iterations, setup=clear_results
+    ))
+    results.append(measure("user_view rerun", num_rows, dashboard.user_view, iterations, payload=payload))
+
+    login("admin", "admin")
+    results.append(measure("admin_view rerun", num_rows, dashboard.admin_view, iterations, payload=payload))
+
+    del client.tables[f"rows_{num_rows}"]
+    dashboard.delete_user("bench_user")
+    clear_results()
+    return results
+
+# Benchmarks for the user store at one store size
+def benchmark_users(dashboard, client, table_names, num_users, iterations):
+    users = make_users(num_users, table_names)
+    # Imports only accept tables in the catalog
+    for name in table_names:
+        client.tables.setdefault(name, make_table(100))
+    dashboard.get_catalog().refresh(client, dashboard.CATALOG_SOURCES)
+    results = []
+    results.append(measure("save_users", num_users, lambda: dashboard.save_users(users), iterations))
+    results.append(measure(
+        "load_users (cold store)", num_users, lambda: dashboard.get_user_store.__wrapped__().users(), iterations
+    ))
+    results.append(measure("load_users (cached)", num_users, dashboard.load_users, iterations))
+    last_user = f"user{num_users - 2}" if num_users > 1 else "admin"
+    results.append(measure(
+        "save_user", num_users, lambda: dashboard.save_user(last_user, users[last_user]), iterations
+    ))
+    password = f"password{num_users - 2}" if num_users > 1 else "admin123"
+    results.append(measure("authenticate", num_users, lambda: dashboard.authenticate(last_user, password), iterations))
+    results.append(measure(
+        "authenticate (wrong password)", num_users, lambda: dashboard.authenticate(last_user, "wrong"), iterations
+    ))
+    results.append(measure(
+        "search_users page", num_users, lambda: dashboard.search_users("user1", 0, dashboard.USERS_PAGE_SIZE), iterations
+    ))
+    exported = dashboard.export_users("csv")
+    results.append(measure("export_users csv", num_users, lambda: dashboard.export_users("csv"), iterations))
+    results.append(measure(
+        "import_users csv", num_users,
+        lambda: dashboard.import_users(dashboard.parse_user_import(exported, "csv")), iterations
+    ))
+    return results
+
+# Function to compare results with a saved baseline by p50 latency
+def compare_with_baseline(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    print(f"\nChange against {baseline_path} (p50):")
+    for result in results:
+        before = baseline.get((result["name"], result["size"]))
+        if before is None or not before["p50_ms"]:
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        print(f"{result['name']:<40} {result['size']:>10,} {before['p50_ms']:>10.2f} -> {result['p50_ms']:>10.2f} ({change:+.0%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against a fake BigQuery client.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000, 10000000],
+                        help="Synthetic table sizes in rows")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 1000, 100000],
+                        help="Synthetic user store sizes")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--store", choices=["json", "sqlite"], default="json", help="User store backend")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per query job")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare p50 latencies with a file written by --json")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Users, settings and databases are written to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="dashboard_benchmark_"))
+    client = FakeBigQueryClient({}, latency=args.latency)
+    payload = PayloadRecorder()
+
+    with mock.patch.object(bigquery, "Client", return_value=client), \
+            mock.patch.object(st, "dataframe", payload.dataframe):
+        dashboard = load_dashboard(args.store)
+        print(f"{'benchmark':<40} {'size':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rss MB':>10} {'bytes sent':>12}")
+        table_names = [f"table_{i}" for i in range(10)]
+        results = []
+        for num_users in args.users:
+            results.extend(benchmark_users(dashboard, client, table_names, num_users, args.iterations))
+        dashboard.save_users(make_users(10, table_names))
+        for num_rows in args.rows:
+            results.extend(benchmark_tables(dashboard, client, num_rows, args.iterations, payload))
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"created_at": time.time(), "args": vars(args), "results": results}, f, indent=2)
+    if baseline_path:
+        compare_with_baseline(results, baseline_path)
+
+if __name__ == "__main__":
+    main()
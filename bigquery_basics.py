@@ -1,37 +1,320 @@
+# Bulk loader for BigQuery. Splits CSV files into gzip-compressed chunks,
+# uploads them concurrently with a pinned schema and records every loaded
+# chunk in a checkpoint file, so an interrupted load resumes where it stopped.
+#
+#   python bigquery_basics.py data/ --schema rawc_schema.json
+#   python bigquery_basics.py "exports/*.csv.gz" --parallelism 8 --chunk-rows 500000
+#   python bigquery_basics.py data/ --local loaded/    # write chunks to a directory instead
+import argparse
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core.exceptions import Conflict, GoogleAPICallError
 from google.cloud import bigquery
 
-client = bigquery.Client(project='bigquery-basics-460109')
+# Default load target
+PROJECT_ID = 'bigquery-basics-460109'
+DATASET_ID = 'rawc_data'
+TABLE_ID = 'rawc_table'
+LOCATION = "US"
+
+# Loader defaults
+CHUNK_ROWS = 200000  # Rows per uploaded chunk
+PARALLELISM = 4  # Concurrent uploads
+SCHEMA_SAMPLE_ROWS = 1000  # Rows read to infer a schema when none is pinned yet
+CHECKPOINT_FILE = "load_checkpoint.jsonl"
+
+# Function to open a source file, transparently decompressing .gz files
+def open_source(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, "r", newline="", encoding="utf-8")
+
+# Function to expand directories and glob patterns into a sorted list of files
+def list_sources(patterns):
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.csv")) + glob.glob(os.path.join(pattern, "*.csv.gz"))
+        else:
+            matches = glob.glob(pattern)
+        for path in sorted(matches):
+            path = os.path.abspath(path)
+            if os.path.isfile(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+# Function to guess the BigQuery type of a column from sample values
+def infer_type(values):
+    values = [value for value in values if value != ""]
+    if not values:
+        return "STRING"
+    if all(value.lower() in ("true", "false") for value in values):
+        return "BOOL"
+    for type_name, parse in (("INT64", int), ("FLOAT64", float)):
+        try:
+            for value in values:
+                parse(value)
+            return type_name
+        except ValueError:
+            continue
+    return "STRING"
+
+# Function to infer a schema from the first rows of a file and pin it to a
+# JSON file, so every later load (and every chunk) uses the same types
+def infer_schema(path, schema_path, skip_leading_rows):
+    with open_source(path) as f:
+        reader = csv.reader(f)
+        header = next(reader) if skip_leading_rows else None
+        sample = [row for _, row in zip(range(SCHEMA_SAMPLE_ROWS), reader)]
+    width = len(header) if header else max((len(row) for row in sample), default=0)
+    names = header or [f"column_{i}" for i in range(width)]
+    schema = []
+    for i, name in enumerate(names):
+        name = re.sub(r"\W", "_", name.strip()) or f"column_{i}"
+        values = [row[i] for row in sample if i < len(row)]
+        schema.append({"name": name, "type": infer_type(values), "mode": "NULLABLE"})
+    with open(schema_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    print(f"Pinned schema with {len(schema)} columns to {schema_path}")
+    return schema
+
+# Function to load the pinned schema, inferring it from the first source file
+# the first time
+def load_schema(schema_path, sources, skip_leading_rows):
+    if not os.path.exists(schema_path):
+        return infer_schema(sources[0], schema_path, skip_leading_rows)
+    with open(schema_path, "r") as f:
+        return json.load(f)
+
+# Checkpoint of loaded chunks, appended one JSON line per chunk so a crash
+# can at worst lose the line being written
+class Checkpoint:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.loaded = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.loaded[entry["key"]] = entry
+
+    def is_loaded(self, key):
+        return key in self.loaded
+
+    def record(self, key, rows, job_id):
+        entry = {"key": key, "rows": rows, "job_id": job_id, "loaded_at": time.time()}
+        with self.lock:
+            self.loaded[key] = entry
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+# Function to split a source file into gzip-compressed CSV chunks. Chunk keys
+# depend on the target table, the file's size and mtime and the chunk size,
+# so a changed file or chunk size is loaded again rather than resumed.
+# Chunks already in the checkpoint are read past without being written.
+def split_file(path, target, chunk_rows, skip_leading_rows, checkpoint, work_dir):
+    stat = os.stat(path)
+    fingerprint = f"{target}|{path}|{stat.st_size}|{stat.st_mtime_ns}|{chunk_rows}"
+    with open_source(path) as f:
+        reader = csv.reader(f)
+        for _ in range(skip_leading_rows):
+            next(reader, None)
+        index = 0
+        while True:
+            key = f"{fingerprint}|{index}"
+            if checkpoint.is_loaded(key):
+                rows = sum(1 for _ in zip(range(chunk_rows), reader))
+                if rows == 0:
+                    return
+                yield key, None, rows
+            else:
+                chunk_path = os.path.join(work_dir, hashlib.sha1(key.encode()).hexdigest()[:16] + ".csv.gz")
+                rows = 0
+                with gzip.open(chunk_path, "wt", newline="", encoding="utf-8", compresslevel=6) as out:
+                    writer = csv.writer(out)
+                    for row in zip(range(chunk_rows), reader):
+                        writer.writerow(row[1])
+                        rows += 1
+                if rows == 0:
+                    os.remove(chunk_path)
+                    return
+                yield key, chunk_path, rows
+            if rows < chunk_rows:
+                return
+            index += 1
+
+# Function to derive the load job id of a chunk from its key. The id is the
+# same on every run, so a chunk whose load finished but was not checkpointed
+# is recognized when the run resumes instead of being loaded twice.
+def chunk_job_id(key):
+    return f"load_{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+
+# Uploader that loads chunks into a BigQuery table
+class BigQueryUploader:
+    def __init__(self, project_id, dataset_id, table_id, location=LOCATION):
+        self.client = bigquery.Client(project=project_id)
+        self.dataset_id = f"{project_id}.{dataset_id}"
+        self.table_id = f"{self.dataset_id}.{table_id}"
+        self.location = location
+        self.schema = None
+
+    def prepare(self, schema):
+        self.schema = [bigquery.SchemaField.from_api_repr(field) for field in schema]
+        dataset = bigquery.Dataset(self.dataset_id)
+        dataset.location = self.location
+        self.client.create_dataset(dataset, exists_ok=True)
+        self.client.create_table(bigquery.Table(self.table_id, schema=self.schema), exists_ok=True)
+
+    # Load a chunk as job "<job_id>_<attempt>". If that job already exists, an
+    # earlier run submitted the chunk: its job is waited for instead, and the
+    # chunk is only loaded again, under the next attempt, if that job failed.
+    def upload(self, chunk_path, rows, job_id):
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.CSV,
+            schema=self.schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            allow_quoted_newlines=True,
+        )
+        attempt = 0
+        while True:
+            attempt_id = f"{job_id}_{attempt}"
+            try:
+                with open(chunk_path, "rb") as source_file:
+                    load_job = self.client.load_table_from_file(
+                        source_file, self.table_id, job_id=attempt_id, location=self.location, job_config=job_config
+                    )
+            except Conflict:
+                existing = self.client.get_job(attempt_id, location=self.location)
+                try:
+                    existing.result()
+                except GoogleAPICallError:
+                    attempt += 1
+                    continue
+                return existing.job_id
+            load_job.result()  # Wait for the job to complete
+            return load_job.job_id
+
+# Local stand-in for BigQueryUploader: copies chunks into a directory, for
+# tests and dry runs without credentials
+class LocalUploader:
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.table_id = os.path.abspath(directory)
+        self.latency = latency
+
+    def prepare(self, schema):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "schema.json"), "w") as f:
+            json.dump(schema, f, indent=2)
 
-# Define the dataset ID
-project_id = 'bigquery-basics-460109'
-dataset_id = f'{project_id}.rawc_data'
+    # Chunks are written under their job id, so reloading one replaces it
+    def upload(self, chunk_path, rows, job_id):
+        time.sleep(self.latency)
+        shutil.copyfile(chunk_path, os.path.join(self.directory, f"{job_id}.csv.gz"))
+        return job_id
 
-# Create a Dataset object
-dataset = bigquery.Dataset(dataset_id)
+# Function to upload one chunk, record it in the checkpoint and delete it
+def upload_chunk(uploader, checkpoint, key, chunk_path, rows):
+    try:
+        job_id = uploader.upload(chunk_path, rows, chunk_job_id(key))
+        checkpoint.record(key, rows, job_id)
+        return rows
+    finally:
+        os.remove(chunk_path)
 
-# Set the location (optional, default is US)
-dataset.location = "US"
+# Function to load every source file through the uploader. At most two chunks
+# per worker are on disk at a time, and failed chunks are left out of the
+# checkpoint so the next run retries them.
+def load_files(sources, uploader, checkpoint, chunk_rows, parallelism, skip_leading_rows, work_dir):
+    start = time.perf_counter()
+    stats = {"rows": 0, "chunks": 0, "resumed_rows": 0, "resumed_chunks": 0, "errors": []}
+    slots = threading.BoundedSemaphore(parallelism * 2)
+    stats_lock = threading.Lock()
 
-# Create the dataset
-dataset = client.create_dataset(dataset, exists_ok=True)  # exists_ok=True prevents errors if the dataset already exists
-print(f"Created dataset {client.project}.{dataset.dataset_id}")
+    def finished(future, rows):
+        slots.release()
+        with stats_lock:
+            error = future.exception()
+            if error is not None:
+                stats["errors"].append(error)
+                return
+            stats["rows"] += rows
+            stats["chunks"] += 1
+            elapsed = time.perf_counter() - start
+            print(f"Loaded {stats['chunks']} chunks, {stats['rows']:,} rows ({stats['rows'] / elapsed:,.0f} rows/s)")
 
-# Define the table ID
-table_id = f'{dataset_id}.rawc_table'
+    with ThreadPoolExecutor(max_workers=parallelism) as pool:
+        for path in sources:
+            for key, chunk_path, rows in split_file(path, uploader.table_id, chunk_rows, skip_leading_rows, checkpoint, work_dir):
+                if chunk_path is None:
+                    stats["resumed_rows"] += rows
+                    stats["resumed_chunks"] += 1
+                    continue
+                slots.acquire()
+                future = pool.submit(upload_chunk, uploader, checkpoint, key, chunk_path, rows)
+                future.add_done_callback(lambda future, rows=rows: finished(future, rows))
+    stats["seconds"] = time.perf_counter() - start
+    return stats
 
-# Load data into the table
-job_config = bigquery.LoadJobConfig(
-    source_format=bigquery.SourceFormat.CSV,
-    skip_leading_rows=1,  # Skip the header row if present
-    autodetect=True,  # Enable schema autodetection
-)
+def main():
+    parser = argparse.ArgumentParser(description="Load CSV files into BigQuery in parallel, resumable chunks.")
+    parser.add_argument("sources", nargs="+", help="Files, directories or glob patterns of .csv/.csv.gz files")
+    parser.add_argument("--project", default=PROJECT_ID, help="BigQuery project")
+    parser.add_argument("--dataset", default=DATASET_ID, help="Target dataset")
+    parser.add_argument("--table", default=TABLE_ID, help="Target table")
+    parser.add_argument("--schema", default=f"{TABLE_ID}_schema.json",
+                        help="Pinned schema JSON; inferred from the first file and written here if missing")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per chunk")
+    parser.add_argument("--parallelism", type=int, default=PARALLELISM, help="Concurrent uploads")
+    parser.add_argument("--skip-leading-rows", type=int, default=1, help="Header rows to skip in each file")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE, help="Checkpoint file of loaded chunks")
+    parser.add_argument("--local", metavar="DIR", help="Copy chunks into DIR instead of loading into BigQuery")
+    args = parser.parse_args()
 
-with open(r'C:\Users\amush\INLP_Project\Finetuning\raw-c.csv', 'rb') as source_file:
-    load_job = client.load_table_from_file(source_file, table_id, job_config=job_config)
+    sources = list_sources(args.sources)
+    if not sources:
+        parser.error("no files match the given sources")
+    schema = load_schema(args.schema, sources, args.skip_leading_rows)
+    if args.local:
+        uploader = LocalUploader(args.local)
+    else:
+        uploader = BigQueryUploader(args.project, args.dataset, args.table)
+    uploader.prepare(schema)
+    checkpoint = Checkpoint(args.checkpoint)
 
-load_job.result()  # Wait for the job to complete
+    work_dir = tempfile.mkdtemp(prefix="bigquery_load_")
+    try:
+        stats = load_files(sources, uploader, checkpoint, args.chunk_rows, max(1, args.parallelism),
+                           args.skip_leading_rows, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
-print(f"Loaded {load_job.output_rows} rows into {table_id}.")
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"Loaded {stats['rows']:,} rows in {stats['chunks']} chunks into {uploader.table_id} "
+          f"in {stats['seconds']:.1f}s ({rate:,.0f} rows/s)")
+    if stats["resumed_chunks"]:
+        print(f"Skipped {stats['resumed_chunks']} chunks ({stats['resumed_rows']:,} rows) already loaded per {args.checkpoint}")
+    if stats["errors"]:
+        for error in stats["errors"]:
+            print(f"Chunk failed: {error}")
+        raise SystemExit(f"{len(stats['errors'])} chunks failed; run again to retry them")
 
-# Display dataset and table information
-print(f"Dataset: {dataset.dataset_id}")
+if __name__ == "__main__":
+    main()
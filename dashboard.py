@@ -1,10 +1,25 @@
 import streamlit as st
 import pandas as pd
-from google.cloud import bigquery
+import numpy as np
 from google.api_core.exceptions import NotFound, BadRequest, Forbidden
+import copy
+import csv
 import hashlib
+import io
 import json
+import logging
 import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
 
 # Initialize session state variables if they don't exist
 if 'authenticated' not in st.session_state:
@@ -17,106 +32,1433 @@ if 'role' not in st.session_state:
 # File to store user credentials
 USERS_FILE = "users.json"
 
-# Initialize BigQuery client
-try:
-    client = bigquery.Client()
-except Exception as e:
-    st.error(f"Failed to initialize BigQuery client: {str(e)}")
-    client = None
+# BigQuery project holding the dashboard tables
+PROJECT_ID = "bigquery-basics-460109"
 
-# Get available tables in the BigQuery dataset
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def get_available_tables():
+# Projects and datasets listed into the table catalog. A dataset of None lists
+# every dataset in the project. Tables in PROJECT_ID are named dataset.table,
+# tables in other projects project.dataset.table.
+CATALOG_SOURCES = [(PROJECT_ID, "rawc_data")]
+CATALOG_DB = "catalog.db"
+CATALOG_REFRESH_INTERVAL = 3600  # Seconds between incremental catalog refreshes
+CATALOG_FULL_REFRESH_INTERVAL = 24 * 3600  # Seconds before an unchanged dataset is re-listed anyway
+CATALOG_WORKERS = 8  # Concurrent list and get calls during a refresh
+CATALOG_SEARCH_LIMIT = 50  # Tables offered by a table picker
+
+# Materialized per-filter tables built by admins from users' row filters
+MATERIALIZED_DATASET = "rawc_data_filtered"
+MATERIALIZED_MAX_AGE = 3600  # Seconds before a filtered table is stale and no longer used
+MATERIALIZED_REBUILD_AGE = 900  # Seconds before a filtered table in use is rebuilt in the background
+MATERIALIZED_REBUILD_WORKERS = 2  # Concurrent background rebuilds
+
+# Per-table settings maintained by admins (e.g. append-only watermark columns)
+TABLE_SETTINGS_FILE = "table_settings.json"
+
+# User store backend: "json" keeps users in USERS_FILE, "sqlite" uses USERS_DB
+# and migrates USERS_FILE into it on first start
+USER_STORE_BACKEND = "json"
+USERS_DB = "users.db"
+USERS_PAGE_SIZE = 50  # Users listed per page in User Management
+IMPORT_VALIDATION_WORKERS = 8  # Concurrent row filter dry runs during a bulk import
+
+# Shared query result cache settings
+RESULT_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Memory budget across all sessions
+RESULT_CACHE_TTL = 600  # Seconds before a cached result is re-queried
+
+# Query cost guardrails, checked with a dry run before a query is executed
+MAX_BYTES_BILLED = {
+    "admin": 1024 ** 4,  # 1 TB per query
+    "user": 10 * 1024 ** 3,  # 10 GB per query
+}
+CONFIRM_BYTES_THRESHOLD = 50 * 1024 ** 3  # Larger queries need explicit confirmation
+
+# Fetched frames are built from Arrow record batches and compacted: integers
+# are downcast and low-cardinality strings become categoricals
+COMPACT_FRAMES = True
+BQSTORAGE_ENABLED = False  # Download results with the BigQuery Storage Read API (needs google-cloud-bigquery-storage)
+SESSION_MEMORY_TTL = 3600  # Seconds before an idle session drops out of the memory report
+
+# Performance instrumentation of reruns and queries
+PERF_MAX_SPANS = 20000  # Timed phases kept in memory
+PERF_MAX_QUERIES = 2000  # Query records kept in memory
+PERF_RECENT_SECONDS = 3600  # Window for the percentiles on the Performance tab
+
+# Interactive filter engine settings
+FILTER_MAX_OPTIONS = 10  # Text columns with fewer distinct values get a multiselect
+FILTER_CACHE_FRAMES = 32  # Fetched frames whose column statistics are kept
+CATEGORY_MAX_RATIO = 0.5  # Text columns below this distinct/rows ratio become categoricals
+COLUMN_PROFILE_TTL = 3600  # Seconds server-side column profiles are cached
+
+# Default number of rows shown to regular users
+USER_DEFAULT_ROW_LIMIT = 100
+
+# Background prefetch of a user's first tables after login (opt-in)
+PREFETCH_ENABLED = False
+PREFETCH_TABLES = 3  # Tables warmed per user
+PREFETCH_WORKERS = 4  # Concurrent prefetch queries across all users
+PREFETCH_PER_USER = 2  # Concurrent prefetch queries per user
+
+# Incremental refresh of append-only tables
+INCREMENTAL_RECONCILE_INTERVAL = 3600  # Seconds between full re-reads that pick up late rows
+INCREMENTAL_MAX_FRAMES = 8  # Append-only results kept for incremental refresh
+INCREMENTAL_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for kept append-only results
+
+# Streaming exports of filtered results
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "dashboard_exports")
+EXPORT_PAGE_SIZE = 10000  # Rows fetched and written per page
+EXPORT_WORKERS = 2  # Exports running at once across all users
+EXPORT_JOBS_PER_USER = 5  # Finished exports kept per user
+
+# Windowed table rendering: only the rows in view are sent to the browser
+TABLE_WINDOW_ROWS = 200  # Rows sent per window
+TABLE_PAYLOAD_BUDGET = 2 * 1024 * 1024  # Bytes per window before switching to a column summary
+
+# Paged data mode for unlimited admin queries
+PAGE_SIZE = 500  # Rows per page
+PAGE_WINDOW = 5  # Pages kept in memory per session
+
+# Seconds before cached table metadata (existence, schema, size) is refetched
+TABLE_METADATA_TTL = 900
+
+# Seconds between background BigQuery connection checks
+HEALTH_CHECK_INTERVAL = 300
+
+# Process-wide BigQuery connection. The client library is imported and the
+# client created on first use, so reruns and the login screen never pay for
+# it, and a background thread keeps the connection status up to date instead
+# of probing BigQuery on every render.
+class BigQueryConnection:
+    def __init__(self, health_check_interval):
+        self.health_check_interval = health_check_interval
+        self.status = "unknown"  # "unknown", "connected", "unavailable" or "error"
+        self.message = ""
+        self.checked_at = None
+        self._client = None
+        self._created = False
+        self._refresher_started = False
+        self._lock = threading.Lock()
+
+    def client(self, retry=False):
+        with self._lock:
+            if not self._created or (retry and self._client is None):
+                try:
+                    from google.cloud import bigquery
+                    self._client = bigquery.Client()
+                except Exception as e:
+                    logger.warning("Failed to initialize BigQuery client: %s", e)
+                    self.message = f"Failed to initialize BigQuery client: {str(e)}"
+                self._created = True
+            return self._client
+
+    def check_health(self):
+        client = self.client(retry=True)
+        if client is None:
+            self.status = "unavailable"
+        else:
+            try:
+                # Test the connection by listing datasets
+                list(client.list_datasets(max_results=1))
+                self.status = "connected"
+                self.message = ""
+            except Exception as e:
+                self.status = "error"
+                self.message = f"BigQuery connection test failed: {str(e)}"
+        self.checked_at = time.time()
+
+    def start_health_refresher(self):
+        with self._lock:
+            if self._refresher_started:
+                return
+            self._refresher_started = True
+        threading.Thread(target=self._refresh_health, daemon=True).start()
+
+    def _refresh_health(self):
+        while True:
+            self.check_health()
+            time.sleep(self.health_check_interval)
+
+# One BigQuery connection shared by every session in this process
+@st.cache_resource
+def get_bigquery_connection():
+    return BigQueryConnection(HEALTH_CHECK_INTERVAL)
+
+# Function to get the BigQuery client, or None when it cannot be created
+def get_bigquery_client():
+    return get_bigquery_connection().client()
+
+# Cross-session cache of query results, keyed by the compiled SQL.
+# Entries are evicted least-recently-used once the memory budget is exceeded
+# and expire after the TTL. Each entry remembers its table so that access
+# changes can drop every cached result for that table.
+class ResultCache:
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (table_name, df, nbytes, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[3] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, table_name, df):
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return  # Never let a single result flush the whole cache
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (table_name, df, nbytes, time.monotonic() + self.ttl)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_table(self, table_name):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[0] == table_name]:
+                self._remove(key)
+
+    def contains(self, key):
+        # Membership check that does not count as a hit or miss
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[3] >= time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+# One result cache shared by every session in this process
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL)
+
+# Coalesces identical concurrent calls: while a call for a key is running,
+# later callers with the same key wait for it and share its result instead of
+# starting their own.
+class SingleFlight:
+    def __init__(self):
+        self.coalesced = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return future.result()
+            except CancelledError:
+                # The leading call was interrupted; run it again
+                return self.do(key, fn)
+        try:
+            result = fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+# One set of in-flight queries shared by every session in this process
+@st.cache_resource
+def get_query_flights():
+    return SingleFlight()
+
+# Arrow to pandas type mapping matching BigQuery's to_dataframe(): nullable
+# integers and booleans instead of float64 and object columns
+def arrow_types_mapper(arrow_type):
+    import pyarrow as pa
+    if pa.types.is_integer(arrow_type):
+        return pd.Int64Dtype()
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    return None
+
+# Function to shrink a DataFrame: integer columns take the smallest type that
+# holds their values and low-cardinality text columns become categoricals
+def compact_frame(df, categorize_text=True):
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            downcast = pd.to_numeric(series, downcast="integer")
+            if downcast.dtype != series.dtype:
+                converted[col] = downcast
+        elif categorize_text and series.dtype == "object" and len(series):
+            try:
+                if series.nunique() / len(series) < CATEGORY_MAX_RATIO:
+                    converted[col] = series.astype("category")
+            except TypeError:
+                pass  # Unhashable values stay as objects
+    return df.assign(**converted) if converted else df
+
+# Function to convert an Arrow table to a DataFrame. Low-cardinality strings
+# are dictionary-encoded in Arrow so they arrive as categoricals without
+# building a Python string per cell, and Arrow buffers are released column by
+# column during the conversion instead of holding both copies.
+def arrow_to_frame(table):
+    if COMPACT_FRAMES and table.num_rows:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        for i, field in enumerate(table.schema):
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                if pc.count_distinct(table.column(i)).as_py() / table.num_rows < CATEGORY_MAX_RATIO:
+                    table = table.set_column(i, field.name, pc.dictionary_encode(table.column(i)))
+    df = table.to_pandas(types_mapper=arrow_types_mapper, self_destruct=True, split_blocks=True)
+    return compact_frame(df, categorize_text=False) if COMPACT_FRAMES else df
+
+# Function to download a query job or row iterator as a compact DataFrame
+def fetch_frame(result):
+    return arrow_to_frame(result.to_arrow(create_bqstorage_client=BQSTORAGE_ENABLED))
+
+# Timings of rerun phases and BigQuery job statistics. Spans and query records
+# are kept in bounded deques; per-table query totals are kept since start-up
+# for the Prometheus counters.
+class PerfRecorder:
+    def __init__(self, max_spans, max_queries):
+        self._spans = deque(maxlen=max_spans)  # (timestamp, phase, seconds, username, table)
+        self._queries = deque(maxlen=max_queries)
+        self._totals = {}  # table -> cumulative query counters
+        self._phase_totals = {}  # phase -> [count, seconds] since start-up
+        self._lock = threading.Lock()
+
+    def record_span(self, phase, seconds, username="", table_name=None):
+        with self._lock:
+            self._spans.append((time.time(), phase, seconds, username, table_name))
+            totals = self._phase_totals.setdefault(phase, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def record_query(self, job, seconds, username="", table_name=None):
+        record = {
+            "timestamp": time.time(),
+            "username": username,
+            "table": table_name,
+            "job_id": getattr(job, "job_id", None),
+            "seconds": seconds,
+            "bytes_processed": getattr(job, "total_bytes_processed", None) or 0,
+            "bytes_billed": getattr(job, "total_bytes_billed", None) or 0,
+            "slot_ms": getattr(job, "slot_millis", None) or 0,
+            "cache_hit": bool(getattr(job, "cache_hit", False)),
+        }
+        with self._lock:
+            self._queries.append(record)
+            totals = self._totals.setdefault(table_name or "", {
+                "queries": 0, "cache_hits": 0, "seconds": 0.0,
+                "bytes_processed": 0, "bytes_billed": 0, "slot_ms": 0,
+            })
+            totals["queries"] += 1
+            totals["cache_hits"] += record["cache_hit"]
+            for key in ("seconds", "bytes_processed", "bytes_billed", "slot_ms"):
+                totals[key] += record[key]
+
+    def phase_percentiles(self, since=None):
+        with self._lock:
+            spans = [s for s in self._spans if since is None or s[0] >= since]
+        by_phase = {}
+        for _, phase, seconds, _, _ in spans:
+            by_phase.setdefault(phase, []).append(seconds)
+        stats = {}
+        for phase, values in sorted(by_phase.items()):
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            stats[phase] = {"count": len(values), "sum": float(sum(values)), "p50": p50, "p95": p95, "p99": p99}
+        return stats
+
+    def queries(self, since=None):
+        with self._lock:
+            return [q for q in self._queries if since is None or q["timestamp"] >= since]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._queries.clear()
+            self._totals.clear()
+            self._phase_totals.clear()
+
+    def to_jsonl(self):
+        with self._lock:
+            spans = list(self._spans)
+            queries = list(self._queries)
+        lines = [
+            json.dumps({"type": "span", "timestamp": t, "phase": phase, "seconds": seconds,
+                        "username": username, "table": table_name})
+            for t, phase, seconds, username, table_name in spans
+        ]
+        lines += [json.dumps({"type": "query", **q}) for q in queries]
+        return "\n".join(lines) + "\n"
+
+    def to_prometheus(self):
+        lines = [
+            "# HELP dashboard_phase_seconds Duration of dashboard rerun phases.",
+            "# TYPE dashboard_phase_seconds summary",
+        ]
+        # Quantiles cover the kept spans; sums and counts cover the whole process
+        with self._lock:
+            phase_totals = {phase: tuple(values) for phase, values in self._phase_totals.items()}
+            totals = {table: dict(values) for table, values in self._totals.items()}
+        for phase, stats in self.phase_percentiles().items():
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f'dashboard_phase_seconds{{phase="{phase}",quantile="{quantile}"}} {stats[key]:.6f}')
+            count, seconds = phase_totals.get(phase, (stats["count"], stats["sum"]))
+            lines.append(f'dashboard_phase_seconds_sum{{phase="{phase}"}} {seconds:.6f}')
+            lines.append(f'dashboard_phase_seconds_count{{phase="{phase}"}} {count}')
+        counters = [
+            ("queries", "dashboard_queries_total", "BigQuery jobs run."),
+            ("cache_hits", "dashboard_query_cache_hits_total", "BigQuery jobs answered from the BigQuery cache."),
+            ("seconds", "dashboard_query_seconds_total", "Time spent running BigQuery jobs."),
+            ("bytes_processed", "dashboard_query_bytes_processed_total", "Bytes processed by BigQuery jobs."),
+            ("bytes_billed", "dashboard_query_bytes_billed_total", "Bytes billed for BigQuery jobs."),
+            ("slot_ms", "dashboard_query_slot_milliseconds_total", "Slot milliseconds used by BigQuery jobs."),
+        ]
+        for key, name, help_text in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for table_name, values in sorted(totals.items()):
+                lines.append(f'{name}{{table="{table_name}"}} {values[key]}')
+        return "\n".join(lines) + "\n"
+
+# One performance recorder shared by every session in this process
+@st.cache_resource
+def get_perf_recorder():
+    return PerfRecorder(PERF_MAX_SPANS, PERF_MAX_QUERIES)
+
+# Username of the session running on this thread; empty on background threads,
+# which have no session
+def current_username():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    if get_script_run_ctx() is None:
+        return ""
+    return st.session_state.get("username", "")
+
+# Time a phase of the current rerun, e.g. `with timed("table_exists"):`
+@contextmanager
+def timed(phase, table_name=None, username=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_perf_recorder().record_span(
+            phase, time.perf_counter() - start,
+            current_username() if username is None else username, table_name
+        )
+
+# Function to run a BigQuery job and wait for it, timing submission and the
+# wait separately and recording the job's statistics
+def run_query_job(client, query, job_config, table_name=None, username=None, **result_options):
+    username = current_username() if username is None else username
+    start = time.perf_counter()
+    with timed("query_submit", table_name, username):
+        job = client.query(query, job_config=job_config)
+    with timed("query_wait", table_name, username):
+        rows = job.result(**result_options)
+    get_perf_recorder().record_query(job, time.perf_counter() - start, username, table_name)
+    return job, rows
+
+# Run a query through the shared result cache. Concurrent callers running the
+# same query share a single BigQuery job.
+def run_cached_query(query, table_name, query_parameters=None, maximum_bytes_billed=None):
+    return execute_query(
+        get_bigquery_client(), get_result_cache(), get_query_flights(),
+        query, table_name, query_parameters, maximum_bytes_billed
+    )
+
+# Query execution behind run_cached_query. Takes its client and caches as
+# arguments so it can also run on background threads.
+def execute_query(client, cache, flights, query, table_name, query_parameters=None, maximum_bytes_billed=None,
+                  username=None):
+    cache_key = query_cache_key(query, query_parameters)
+    df = cache.get(cache_key)
+    if df is None:
+        def execute():
+            from google.cloud import bigquery
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=query_parameters or [],
+                maximum_bytes_billed=maximum_bytes_billed
+            )
+            _, rows = run_query_job(client, query, job_config, table_name, username)
+            with timed("to_dataframe", table_name, username):
+                result = fetch_frame(rows)
+            cache.put(cache_key, table_name, result)
+            return result
+        
+        df = flights.do(cache_key, execute)
+    return df
+
+# Cache key for a compiled query and its parameter values
+def query_cache_key(query, query_parameters=None):
+    if not query_parameters:
+        return query
+    return query + "\n" + json.dumps(
+        [p.to_api_repr() for p in query_parameters], sort_keys=True, default=str
+    )
+
+# Estimated bytes processed for a query, from a cached dry run
+@st.cache_data(ttl=3600, show_spinner=False)
+def estimate_query_bytes(cache_key, query, _query_parameters=None):
+    from google.cloud import bigquery
+    client = get_bigquery_client()
+    job_config = bigquery.QueryJobConfig(
+        dry_run=True,
+        use_query_cache=False,
+        query_parameters=_query_parameters or []
+    )
+    return client.query(query, job_config=job_config).total_bytes_processed or 0
+
+# Human-readable byte count
+def format_bytes(num_bytes):
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if num_bytes < 1024 or unit == "TB":
+            return f"{num_bytes:,.1f} {unit}"
+        num_bytes /= 1024
+
+# Check a query's estimated cost before running it. Returns None when the query
+# may run, or a message explaining why it was not run. Results that are already
+# cached cost nothing and skip the check.
+def check_query_cost(query, table_name, query_parameters=None):
+    cache_key = query_cache_key(query, query_parameters)
+    if get_result_cache().contains(cache_key):
+        return None
+    
+    estimated_bytes = estimate_query_bytes(cache_key, query, query_parameters)
+    role = st.session_state.role
+    limit = MAX_BYTES_BILLED.get(role)
+    logger.info(
+        "Query estimate: table=%s user=%s bytes=%d", table_name, st.session_state.username, estimated_bytes
+    )
+    st.caption(f"Estimated data scanned: {format_bytes(estimated_bytes)}")
+    
+    if limit is not None and estimated_bytes > limit:
+        return (
+            f"This query would scan {format_bytes(estimated_bytes)}, which is over the "
+            f"{format_bytes(limit)} limit for your role. Select fewer columns or add filters."
+        )
+    if estimated_bytes > CONFIRM_BYTES_THRESHOLD:
+        st.warning(f"This query will scan {format_bytes(estimated_bytes)} of data.")
+        confirm_key = "confirm_" + hashlib.sha256(cache_key.encode()).hexdigest()[:16]
+        if not st.checkbox("Run this query anyway", key=confirm_key):
+            return "Confirm the query above to run it."
+    return None
+
+# Function to split a table name into (project, dataset, table). Names without
+# a project are in PROJECT_ID; returns None for malformed names.
+def split_table_name(table_name):
+    parts = table_name.split('.')
+    if len(parts) == 2:
+        return (PROJECT_ID, parts[0], parts[1])
+    if len(parts) == 3:
+        return tuple(parts)
+    return None
+
+# Function to get the fully qualified name of a table for use in SQL
+def table_path(table_name):
+    return ".".join(split_table_name(table_name))
+
+# Function to name a catalog table the way users and settings refer to it
+def catalog_table_name(project, dataset_id, table_id):
+    if project == PROJECT_ID:
+        return f"{dataset_id}.{table_id}"
+    return f"{project}.{dataset_id}.{table_id}"
+
+# Function to rank table names for a search: names whose table (or full name)
+# starts with the text first, then names containing it
+def search_table_names(table_names, text, limit):
+    text = text.strip().lower()
+    if not text:
+        return list(table_names)[:limit]
+    prefix, contains = [], []
+    for table_name in table_names:
+        name = table_name.lower()
+        if name.startswith(text) or name.rsplit('.', 1)[-1].startswith(text):
+            prefix.append(table_name)
+        elif text in name:
+            contains.append(table_name)
+    return (prefix + contains)[:limit]
+
+SQLITE_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    project TEXT NOT NULL,
+    dataset_id TEXT NOT NULL,
+    etag TEXT,
+    modified REAL,
+    listed_at REAL NOT NULL,
+    PRIMARY KEY (project, dataset_id)
+);
+CREATE TABLE IF NOT EXISTS tables (
+    name TEXT PRIMARY KEY,
+    project TEXT NOT NULL,
+    dataset_id TEXT NOT NULL,
+    table_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tables_dataset ON tables(project, dataset_id);
+"""
+
+# Local index of the tables in CATALOG_SOURCES, kept in SQLite so pickers can
+# search tens of thousands of tables without listing them from BigQuery. A
+# refresh gets every dataset concurrently and re-lists only those whose etag
+# or modification time changed. Creating a table does not always touch its
+# dataset's metadata, so unchanged datasets are still re-listed once they are
+# older than CATALOG_FULL_REFRESH_INTERVAL.
+class CatalogIndex:
+    def __init__(self, path):
+        self.path = path
+        self.refreshed_at = 0.0  # Not persisted: each process refreshes once on first use
+        self.last_stats = None  # Stats of the last refresh, including its errors
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SQLITE_CATALOG_SCHEMA)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tables").fetchone()[0]
+
+    def names(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT name FROM tables ORDER BY name")]
+
+    # Set of the given table names that are in the catalog
+    def contains(self, table_names):
+        table_names = list(table_names)
+        known = set()
+        with self._lock:
+            for i in range(0, len(table_names), 500):
+                batch = table_names[i:i + 500]
+                known.update(row[0] for row in self._conn.execute(
+                    f"SELECT name FROM tables WHERE name IN ({', '.join('?' * len(batch))})", batch
+                ))
+        return known
+
+    # Table names containing the text, prefix matches on the table or full name first
+    def search(self, text, limit):
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT name FROM tables
+                WHERE instr(lower(name), :text) > 0
+                ORDER BY (instr(lower(table_id), :text) = 1 OR instr(lower(name), :text) = 1) DESC, name
+                LIMIT :limit
+                """,
+                {"text": text.strip().lower(), "limit": limit}
+            )
+            return [row[0] for row in rows]
+
+    def refresh(self, client, sources, force=False):
+        with self._refresh_lock:
+            return self._refresh(client, sources, force)
+
+    def refresh_in_background(self, client, sources):
+        if time.time() - self.refreshed_at < CATALOG_REFRESH_INTERVAL:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        def run():
+            try:
+                self._refresh(client, sources, False)
+            except Exception as e:
+                logger.warning("Catalog refresh failed: %s", e)
+            finally:
+                self._refresh_lock.release()
+        threading.Thread(target=run, daemon=True).start()
+
+    def _refresh(self, client, sources, force):
+        stats = {"datasets": 0, "listed": 0, "removed": 0, "errors": []}
+        now = time.time()
+        with self._lock:
+            known = {
+                (project, dataset_id): (etag, modified, listed_at)
+                for project, dataset_id, etag, modified, listed_at in self._conn.execute(
+                    "SELECT project, dataset_id, etag, modified, listed_at FROM datasets"
+                )
+            }
+        with timed("table_listing"), ThreadPoolExecutor(max_workers=CATALOG_WORKERS) as pool:
+            # Expand whole-project sources into their datasets
+            datasets = {(project, dataset_id) for project, dataset_id in sources if dataset_id is not None}
+            unlisted_projects = set()
+            project_futures = {
+                pool.submit(lambda project: [d.dataset_id for d in client.list_datasets(project)], project): project
+                for project in {project for project, dataset_id in sources if dataset_id is None}
+            }
+            for future in as_completed(project_futures):
+                project = project_futures[future]
+                try:
+                    datasets.update((project, dataset_id) for dataset_id in future.result())
+                except Exception as e:
+                    unlisted_projects.add(project)
+                    stats["errors"].append(f"{project}: {e}")
+
+            dataset_futures = {
+                pool.submit(self._list_dataset, client, project, dataset_id, known.get((project, dataset_id)), force, now):
+                    (project, dataset_id)
+                for project, dataset_id in datasets
+            }
+            for future in as_completed(dataset_futures):
+                project, dataset_id = dataset_futures[future]
+                try:
+                    etag, modified, table_ids = future.result()
+                except NotFound:
+                    datasets.discard((project, dataset_id))
+                    continue
+                except Exception as e:
+                    # Keep the dataset's tables until it can be listed again
+                    datasets.discard((project, dataset_id))
+                    known.pop((project, dataset_id), None)
+                    stats["errors"].append(f"{project}.{dataset_id}: {e}")
+                    continue
+                stats["datasets"] += 1
+                if table_ids is not None:
+                    self._store_dataset(project, dataset_id, etag, modified, table_ids, now)
+                    stats["listed"] += 1
+
+        # Datasets that were deleted or are no longer configured
+        for project, dataset_id in set(known) - datasets:
+            if project not in unlisted_projects:
+                self._store_dataset(project, dataset_id, None, None, None, now)
+                stats["removed"] += 1
+        self.refreshed_at = now
+        self.last_stats = stats
+        return stats
+
+    # Function to list a dataset's tables, or return None for them when its
+    # etag and modification time match the index and it was listed recently
+    def _list_dataset(self, client, project, dataset_id, known, force, now):
+        dataset_ref = client.dataset(dataset_id, project=project)
+        dataset = client.get_dataset(dataset_ref)
+        modified = dataset.modified.timestamp() if dataset.modified else None
+        if (not force and known is not None and tuple(known[:2]) == (dataset.etag, modified)
+                and now - known[2] < CATALOG_FULL_REFRESH_INTERVAL):
+            return dataset.etag, modified, None
+        return dataset.etag, modified, [table.table_id for table in client.list_tables(dataset_ref)]
+
+    # Replace a dataset's tables in one transaction; table_ids of None removes it
+    def _store_dataset(self, project, dataset_id, etag, modified, table_ids, listed_at):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM tables WHERE project = ? AND dataset_id = ?", (project, dataset_id))
+                if table_ids is None:
+                    self._conn.execute("DELETE FROM datasets WHERE project = ? AND dataset_id = ?", (project, dataset_id))
+                else:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO tables (name, project, dataset_id, table_id) VALUES (?, ?, ?, ?)",
+                        [(catalog_table_name(project, dataset_id, table_id), project, dataset_id, table_id)
+                         for table_id in table_ids]
+                    )
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO datasets (project, dataset_id, etag, modified, listed_at) VALUES (?, ?, ?, ?, ?)",
+                        (project, dataset_id, etag, modified, listed_at)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+# One catalog index shared by every session in this process
+@st.cache_resource
+def get_catalog():
+    return CatalogIndex(CATALOG_DB)
+
+# Refresh the catalog in the background once it is older than the refresh
+# interval. An empty catalog is filled before returning so the first render
+# has tables; returns that refresh's stats, or None. A refresh that leaves the
+# catalog empty (e.g. a missing or forbidden dataset) is not retried for
+# CATALOG_REFRESH_INTERVAL; until then its stats are returned again.
+def refresh_catalog():
+    client = get_bigquery_client()
     if client is None:
+        return None
+    catalog = get_catalog()
+    if catalog.count() == 0:
+        if time.time() - catalog.refreshed_at < CATALOG_REFRESH_INTERVAL:
+            return catalog.last_stats
+        return catalog.refresh(client, CATALOG_SOURCES)
+    catalog.refresh_in_background(client, CATALOG_SOURCES)
+    return None
+
+# Get every table in the catalog
+def get_available_tables():
+    if get_bigquery_client() is None:
         return []
-    
-    try:
-        # Try to query the dataset to get actual tables
-        dataset_ref = client.dataset('rawc_data', project='bigquery-basics-460109')
-        tables = list(client.list_tables(dataset_ref))
-        return [f"rawc_data.{table.table_id}" for table in tables]
-    except Exception as e:
-        # If dataset doesn't exist or any other error, return a default list for demo purposes
-        st.warning(f"Could not fetch real tables from BigQuery: {str(e)}")
+    stats = refresh_catalog()
+    tables = get_catalog().names()
+    if not tables and stats and stats["errors"]:
+        # If no dataset could be listed, return a default list for demo purposes
+        st.warning(f"Could not fetch real tables from BigQuery: {stats['errors'][0]}")
         st.info("Using demo tables for demonstration purposes.")
         return [
             "demo_table_1",
             "demo_table_2",
             "demo_table_3"
         ]
+    return tables
+
+# Function to keep the given tables that are in the catalog, in their order
+def filter_available_tables(table_names):
+    if get_bigquery_client() is None:
+        return []
+    refresh_catalog()
+    known = get_catalog().contains(table_names)
+    return [t for t in table_names if t in known]
+
+# Cache of per-table metadata: existence, schema, row count, size and
+# partitioning. Entries expire after the TTL; a background thread refreshes
+# stale entries for every listed table so lookups on the request path rarely
+# need a get_table round trip.
+class TableMetadataCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self, table_name):
+        with self._lock:
+            entry = self._entries.get(table_name)
+        if entry is not None and entry["expires_at"] > time.monotonic():
+            return entry
+        return self._fetch(table_name)
+
+    def invalidate(self, table_name):
+        with self._lock:
+            self._entries.pop(table_name, None)
+
+    def refresh_in_background(self, table_names):
+        with self._lock:
+            if self._refreshing:
+                return
+            now = time.monotonic()
+            stale = [
+                t for t in table_names
+                if t not in self._entries or self._entries[t]["expires_at"] <= now
+            ]
+            if not stale:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, args=(stale,), daemon=True).start()
+
+    def _refresh(self, table_names):
+        try:
+            for table_name in table_names:
+                self._fetch(table_name)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _fetch(self, table_name):
+        entry = {
+            "exists": False,
+            "schema": [],
+            "num_rows": None,
+            "num_bytes": None,
+            "modified": None,
+            "partitioning": None,
+            "clustering": None,
+            "expires_at": time.monotonic() + self.ttl,
+        }
+        # Split table name into project, dataset and table
+        parts = split_table_name(table_name)
+        if parts is None:
+            return entry
+        client = get_bigquery_client()
+        if client is None:
+            return entry
+        project, dataset_id, table_id = parts
+        try:
+            table = client.get_table(client.dataset(dataset_id, project=project).table(table_id))
+        except NotFound:
+            pass
+        except Exception:
+            return entry  # Transient errors are not cached
+        else:
+            entry["exists"] = True
+            entry["schema"] = [
+                {"name": field.name, "type": field.field_type, "mode": field.mode}
+                for field in table.schema
+            ]
+            entry["num_rows"] = table.num_rows
+            entry["num_bytes"] = table.num_bytes
+            entry["modified"] = table.modified.timestamp() if table.modified else None
+            if table.time_partitioning is not None:
+                entry["partitioning"] = (
+                    f"{table.time_partitioning.type_} on "
+                    f"{table.time_partitioning.field or '_PARTITIONTIME'}"
+                )
+            elif table.range_partitioning is not None:
+                entry["partitioning"] = f"RANGE on {table.range_partitioning.field}"
+            entry["clustering"] = table.clustering_fields
+        with self._lock:
+            self._entries[table_name] = entry
+        return entry
+
+# One table metadata cache shared by every session in this process
+@st.cache_resource
+def get_table_metadata_cache():
+    return TableMetadataCache(TABLE_METADATA_TTL)
+
+# Function to get cached metadata for a table
+def get_table_metadata(table_name):
+    return get_table_metadata_cache().get(table_name)
+
+# Function to get the cached schema of a table as a list of field dicts
+def get_table_schema(table_name):
+    return get_table_metadata(table_name)["schema"]
+
+# Refresh metadata for the given tables in the background
+def warm_table_metadata(table_names):
+    get_table_metadata_cache().refresh_in_background(table_names)
 
 # Function to check if a table exists
 def table_exists(table_name):
-    if client is None:
-        return False
-        
-    try:
-        # Split table name into dataset and table
-        parts = table_name.split('.')
-        if len(parts) != 2:
-            return False
-            
-        dataset_id, table_id = parts
-        table_ref = client.dataset(dataset_id).table(table_id)
-        client.get_table(table_ref)
-        return True
-    except NotFound:
-        return False
-    except Exception:
-        return False
+    with timed("table_exists", table_name):
+        return get_table_metadata(table_name)["exists"]
 
 # Initialize the users file if it doesn't exist
 def initialize_users_file():
     if not os.path.exists(USERS_FILE):
-        admin_password = hashlib.sha256("admin123".encode()).hexdigest()
-        default_users = {
-            "admin": {
-                "password": admin_password, 
-                "role": "admin",
-                "data_access": {
-                    "tables": get_available_tables(),  # Admin has access to all tables
-                    "row_filters": {}  # No row filters for admin
+        with open(USERS_FILE, "w") as f:
+            json.dump(get_default_users(), f)
+
+# Users created for a fresh installation
+def get_default_users():
+    admin_password = hashlib.sha256("admin123".encode()).hexdigest()
+    return {
+        "admin": {
+            "password": admin_password, 
+            "role": "admin",
+            "data_access": {
+                "tables": get_available_tables(),  # Admin has access to all tables
+                "row_filters": {}  # No row filters for admin
+            }
+        },
+    }
+
+# Ensure all users have the data_access field
+def ensure_data_access(users):
+    for username, user_data in users.items():
+        if "data_access" not in user_data:
+            users[username]["data_access"] = {
+                "tables": [] if user_data["role"] != "admin" else get_available_tables(),
+                "row_filters": {}
+            }
+
+# Modification time and size of a file, or None if it does not exist
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Process-wide, in-memory view of the users file. The file is parsed once and
+# only re-read when its mtime or size changes. The cached table is never
+# modified: saves build a new one under the lock and swap it in, so sessions
+# iterating the previous table are unaffected. Callers get copies.
+class JsonUserStore:
+    def __init__(self, path):
+        self.path = path
+        self.generation = 0
+        self._users = None
+        self._signature = None
+        self._lock = threading.Lock()
+    
+    # The current user table; the caller holds the lock
+    def _snapshot(self):
+        signature = file_signature(self.path)
+        if self._users is None or signature != self._signature:
+            if signature is None:
+                initialize_users_file()
+                signature = file_signature(self.path)
+            with open(self.path, "r") as f:
+                users = json.load(f)
+            ensure_data_access(users)
+            self._users = users
+            self._signature = signature
+            self.generation += 1
+        return self._users
+    
+    def users(self):
+        with self._lock:
+            users = self._snapshot()
+        return copy.deepcopy(users)
+    
+    def get_user(self, username):
+        with self._lock:
+            user_data = self._snapshot().get(username)
+        return copy.deepcopy(user_data)
+    
+    # Write a new user table and make it current; the caller holds the lock
+    def _write(self, users):
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(users, f)
+        os.replace(tmp_path, self.path)
+        ensure_data_access(users)
+        self._users = users
+        self._signature = file_signature(self.path)
+        self.generation += 1
+    
+    def save(self, users):
+        with self._lock:
+            self._write(copy.deepcopy(users))
+    
+    def save_user(self, username, user_data):
+        self.save_many({username: user_data})
+    
+    # Add or replace many users with a single file write
+    def save_many(self, updates):
+        with self._lock:
+            users = dict(self._snapshot())
+            users.update(copy.deepcopy(updates))
+            self._write(users)
+    
+    def delete_user(self, username):
+        with self._lock:
+            users = dict(self._snapshot())
+            users.pop(username, None)
+            self._write(users)
+    
+    # One page of (username, role, table count, row filter count) for the
+    # usernames containing the search text, and the number of matches
+    def search_users(self, text, offset, limit):
+        with self._lock:
+            users = self._snapshot()
+        text = text.strip().lower()
+        matches = sorted(username for username in users if text in username.lower())
+        page = [
+            (
+                username,
+                users[username]["role"],
+                len(users[username].get("data_access", {}).get("tables", [])),
+                len(users[username].get("data_access", {}).get("row_filters", {}))
+            )
+            for username in matches[offset:offset + limit]
+        ]
+        return page, len(matches)
+
+SQLITE_USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS table_grants (
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    table_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (username, table_name)
+);
+CREATE INDEX IF NOT EXISTS idx_table_grants_table ON table_grants(table_name);
+CREATE TABLE IF NOT EXISTS row_filters (
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    table_name TEXT NOT NULL,
+    predicate TEXT NOT NULL,
+    compiled TEXT,  -- Validated, normalized predicate; NULL until validated
+    PRIMARY KEY (username, table_name)
+);
+CREATE INDEX IF NOT EXISTS idx_row_filters_table ON row_filters(table_name);
+CREATE TABLE IF NOT EXISTS column_grants (
+    username TEXT NOT NULL REFERENCES users(username) ON DELETE CASCADE,
+    table_name TEXT NOT NULL,
+    allowed TEXT NOT NULL,
+    default_columns TEXT NOT NULL,
+    PRIMARY KEY (username, table_name)
+);
+"""
+
+# SQLite-backed user and access-policy store. Runs in WAL mode so readers never
+# block the writer, and every change is a single-user transaction, so concurrent
+# admins editing different users cannot overwrite each other. The full user
+# table is cached in memory and revalidated with PRAGMA data_version, which only
+# changes when another connection commits. As in JsonUserStore, the cached
+# table is replaced rather than modified, and callers get copies.
+class SqliteUserStore:
+    def __init__(self, path, migrate_from=None):
+        self.path = path
+        self.generation = 0
+        self._users = None
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SQLITE_USERS_SCHEMA)
+        # Databases created before row filters were validated lack the compiled column
+        if "compiled" not in {row[1] for row in self._conn.execute("PRAGMA table_info(row_filters)")}:
+            self._conn.execute("ALTER TABLE row_filters ADD COLUMN compiled TEXT")
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+                if migrate_from and os.path.exists(migrate_from):
+                    with open(migrate_from, "r") as f:
+                        users = json.load(f)
+                else:
+                    users = get_default_users()
+                ensure_data_access(users)
+                self._replace_all(users)
+
+    def _current_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def users(self):
+        with self._lock:
+            data_version = self._current_data_version()
+            if self._users is None or data_version != self._data_version:
+                users = {
+                    username: {
+                        "password": password,
+                        "role": role,
+                        "data_access": {"tables": [], "row_filters": {}, "compiled_filters": {}, "columns": {}}
+                    }
+                    for username, password, role in self._conn.execute(
+                        "SELECT username, password, role FROM users"
+                    )
                 }
-            },
+                for username, table_name in self._conn.execute(
+                    "SELECT username, table_name FROM table_grants ORDER BY username, position"
+                ):
+                    users[username]["data_access"]["tables"].append(table_name)
+                for username, table_name, predicate, compiled in self._conn.execute(
+                    "SELECT username, table_name, predicate, compiled FROM row_filters"
+                ):
+                    users[username]["data_access"]["row_filters"][table_name] = predicate
+                    if compiled is not None:
+                        users[username]["data_access"]["compiled_filters"][table_name] = {
+                            "source": predicate, "predicate": compiled
+                        }
+                for username, table_name, allowed, default_columns in self._conn.execute(
+                    "SELECT username, table_name, allowed, default_columns FROM column_grants"
+                ):
+                    users[username]["data_access"]["columns"][table_name] = {
+                        "allowed": json.loads(allowed),
+                        "default": json.loads(default_columns)
+                    }
+                self._users = users
+                self._data_version = data_version
+                self.generation += 1
+            users = self._users
+        return copy.deepcopy(users)
+    
+    def get_user(self, username):
+        with self._lock:
+            # Serve from the cached table while no other connection has written
+            if self._users is not None and self._current_data_version() == self._data_version:
+                return copy.deepcopy(self._users.get(username))
+            return self._read_user(username)
+    
+    def save(self, users):
+        users = copy.deepcopy(users)
+        with self._lock:
+            ensure_data_access(users)
+            self._replace_all(users)
+            self._users = users
+            self._data_version = self._current_data_version()
+            self.generation += 1
+    
+    def save_user(self, username, user_data):
+        self.save_many({username: user_data})
+    
+    # Add or replace many users in a single transaction
+    def save_many(self, updates):
+        updates = copy.deepcopy(updates)
+        with self._lock:
+            ensure_data_access(updates)
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for username, user_data in updates.items():
+                    self._write_user(username, user_data)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self._users is not None:
+                users = dict(self._users)
+                users.update(updates)
+                self._users = users
+            self.generation += 1
+    
+    def delete_user(self, username):
+        with self._lock:
+            self._conn.execute("DELETE FROM users WHERE username = ?", (username,))
+            if self._users is not None:
+                users = dict(self._users)
+                users.pop(username, None)
+                self._users = users
+            self.generation += 1
+
+    # Search and page in SQL so listing users never loads the whole table
+    def search_users(self, text, offset, limit):
+        text = text.strip().lower()
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM users WHERE instr(lower(username), ?) > 0", (text,)
+            ).fetchone()[0]
+            page = self._conn.execute(
+                """
+                SELECT u.username, u.role,
+                       (SELECT COUNT(*) FROM table_grants g WHERE g.username = u.username),
+                       (SELECT COUNT(*) FROM row_filters f WHERE f.username = u.username)
+                FROM users u
+                WHERE instr(lower(u.username), ?) > 0
+                ORDER BY u.username
+                LIMIT ? OFFSET ?
+                """,
+                (text, limit, offset)
+            ).fetchall()
+        return page, total
+
+    def _read_user(self, username):
+        row = self._conn.execute(
+            "SELECT password, role FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None
+        tables = [
+            table_name for (table_name,) in self._conn.execute(
+                "SELECT table_name FROM table_grants WHERE username = ? ORDER BY position",
+                (username,)
+            )
+        ]
+        row_filters = {}
+        compiled_filters = {}
+        for table_name, predicate, compiled in self._conn.execute(
+            "SELECT table_name, predicate, compiled FROM row_filters WHERE username = ?", (username,)
+        ):
+            row_filters[table_name] = predicate
+            if compiled is not None:
+                compiled_filters[table_name] = {"source": predicate, "predicate": compiled}
+        columns = {
+            table_name: {"allowed": json.loads(allowed), "default": json.loads(default_columns)}
+            for table_name, allowed, default_columns in self._conn.execute(
+                "SELECT table_name, allowed, default_columns FROM column_grants WHERE username = ?",
+                (username,)
+            )
         }
-        with open(USERS_FILE, "w") as f:
-            json.dump(default_users, f)
+        return {
+            "password": row[0],
+            "role": row[1],
+            "data_access": {
+                "tables": tables,
+                "row_filters": row_filters,
+                "compiled_filters": compiled_filters,
+                "columns": columns
+            }
+        }
+
+    def _write_user(self, username, user_data):
+        self._conn.execute(
+            "INSERT INTO users (username, password, role) VALUES (?, ?, ?) "
+            "ON CONFLICT(username) DO UPDATE SET password = excluded.password, role = excluded.role",
+            (username, user_data["password"], user_data["role"])
+        )
+        self._conn.execute("DELETE FROM table_grants WHERE username = ?", (username,))
+        self._conn.execute("DELETE FROM row_filters WHERE username = ?", (username,))
+        self._conn.execute("DELETE FROM column_grants WHERE username = ?", (username,))
+        data_access = user_data["data_access"]
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO table_grants (username, table_name, position) VALUES (?, ?, ?)",
+            [(username, table, i) for i, table in enumerate(data_access["tables"])]
+        )
+        compiled_filters = data_access.get("compiled_filters", {})
+        self._conn.executemany(
+            "INSERT INTO row_filters (username, table_name, predicate, compiled) VALUES (?, ?, ?, ?)",
+            [
+                (username, table, predicate, compiled_predicate(compiled_filters.get(table), predicate))
+                for table, predicate in data_access["row_filters"].items()
+            ]
+        )
+        self._conn.executemany(
+            "INSERT INTO column_grants (username, table_name, allowed, default_columns) VALUES (?, ?, ?, ?)",
+            [
+                (username, table, json.dumps(policy.get("allowed", [])), json.dumps(policy.get("default", [])))
+                for table, policy in data_access.get("columns", {}).items()
+            ]
+        )
 
-initialize_users_file()
+    def _replace_all(self, users):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            existing = {username for (username,) in self._conn.execute("SELECT username FROM users")}
+            self._conn.executemany(
+                "DELETE FROM users WHERE username = ?",
+                [(username,) for username in existing - set(users)]
+            )
+            for username, user_data in users.items():
+                self._write_user(username, user_data)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+# One-shot migration of a users.json file into a SQLite user store
+def migrate_users_json(json_path=USERS_FILE, db_path=USERS_DB):
+    with open(json_path, "r") as f:
+        users = json.load(f)
+    SqliteUserStore(db_path).save(users)
+    return len(users)
+
+# One user store shared by every session in this process
+@st.cache_resource
+def get_user_store():
+    if USER_STORE_BACKEND == "sqlite":
+        return SqliteUserStore(USERS_DB, migrate_from=USERS_FILE)
+    return JsonUserStore(USERS_FILE)
+
+# Process-wide view of the table settings file, re-read only when it changes
+class TableSettingsStore:
+    def __init__(self, path):
+        self.path = path
+        self._settings = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def settings(self):
+        with self._lock:
+            return self._load()
+
+    def save(self, settings):
+        with self._lock:
+            self._write(settings)
+
+    # Re-read, change and write the settings of one table under a single lock,
+    # so concurrent rebuilds and admin saves never drop each other's entries.
+    # fn gets a copy of the table's settings; empty results remove the entry.
+    def update(self, table_name, fn):
+        with self._lock:
+            settings = dict(self._load())
+            table_settings = fn(dict(settings.get(table_name, {})))
+            if table_settings:
+                settings[table_name] = table_settings
+            else:
+                settings.pop(table_name, None)
+            self._write(settings)
+            return table_settings
+
+    # Reload the file if it changed on disk; callers hold the lock
+    def _load(self):
+        signature = file_signature(self.path)
+        if self._settings is None or signature != self._signature:
+            if signature is None:
+                self._settings = {}
+            else:
+                with open(self.path, "r") as f:
+                    self._settings = json.load(f)
+            self._signature = signature
+        return self._settings
+
+    # Write the settings atomically; callers hold the lock
+    def _write(self, settings):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(settings, f)
+        os.replace(tmp_path, self.path)
+        self._settings = settings
+        self._signature = file_signature(self.path)
+
+# One table settings store shared by every session in this process
+@st.cache_resource
+def get_table_settings_store():
+    return TableSettingsStore(TABLE_SETTINGS_FILE)
+
+# Function to get the admin-maintained settings of a table
+def get_table_settings(table_name):
+    return get_table_settings_store().settings().get(table_name, {})
+
+# Function to update the settings of a table with fn; empty settings remove the entry
+def update_table_settings(table_name, fn):
+    return get_table_settings_store().update(table_name, fn)
 
 # Function to load users from file
 def load_users():
-    if not os.path.exists(USERS_FILE):
-        initialize_users_file()
-    
-    with open(USERS_FILE, "r") as f:
-        users = json.load(f)
-        # Ensure all users have the data_access field
-        for username, user_data in users.items():
-            if "data_access" not in user_data:
-                users[username]["data_access"] = {
-                    "tables": [] if user_data["role"] != "admin" else get_available_tables(),
-                    "row_filters": {}
-                }
-        return users
+    with timed("user_store_load"):
+        return get_user_store().users()
+
+# Function to look up a single user without copying the whole user table
+def get_user(username):
+    with timed("user_store_load"):
+        return get_user_store().get_user(username)
 
 # Function to save users to file
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f)
+    get_user_store().save(users)
+
+# Function to save a single user without rewriting the others
+def save_user(username, user_data):
+    get_user_store().save_user(username, user_data)
+
+# Function to add or replace many users in one write
+def save_many_users(updates):
+    get_user_store().save_many(updates)
+
+# Function to get one page of user summaries matching a search
+def search_users(text="", offset=0, limit=USERS_PAGE_SIZE):
+    with timed("user_store_load"):
+        return get_user_store().search_users(text, offset, limit)
+
+# Function to delete a single user
+def delete_user(username):
+    get_user_store().delete_user(username)
 
 # Authentication function
 def authenticate(username, password):
-    users = load_users()
-    if username in users:
-        stored_password = users[username]["password"]
-        hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        if stored_password == hashed_password:
-            st.session_state.authenticated = True
-            st.session_state.username = username
-            st.session_state.role = users[username]["role"]
-            return True
-    return False
+    with timed("authentication", username=username):
+        user_data = get_user(username)
+        if user_data is not None:
+            stored_password = user_data["password"]
+            hashed_password = hashlib.sha256(password.encode()).hexdigest()
+            if stored_password == hashed_password:
+                st.session_state.authenticated = True
+                st.session_state.username = username
+                st.session_state.role = user_data["role"]
+                return True
+        return False
 
 # Logout function
 def logout():
@@ -124,33 +1466,279 @@ def logout():
     st.session_state.username = ""
     st.session_state.role = ""
 
+# Function to validate a user's row filters. Filters compiled earlier from the
+# same text are kept; others are validated. Returns the compiled filters and a
+# list of errors.
+def compile_row_filters(row_filters, previous):
+    compiled_filters = {}
+    errors = []
+    for table_name, row_filter in row_filters.items():
+        if compiled_predicate(previous.get(table_name), row_filter) is not None:
+            compiled_filters[table_name] = previous[table_name]
+            continue
+        try:
+            predicate = validate_row_filter(table_name, row_filter)
+        except ValueError as e:
+            errors.append(str(e))
+        else:
+            compiled_filters[table_name] = {"source": row_filter, "predicate": predicate}
+    return compiled_filters, errors
+
+# (username, table) pairs whose stored row filter has no matching compiled form
+def unvalidated_row_filters(users):
+    return [
+        (username, table_name)
+        for username, user_data in users.items()
+        for table_name, row_filter in user_data.get("data_access", {}).get("row_filters", {}).items()
+        if row_filter.strip() and compiled_predicate(
+            user_data["data_access"].get("compiled_filters", {}).get(table_name), row_filter
+        ) is None
+    ]
+
+# Function to validate stored row filters and save the ones that pass
+def validate_stored_row_filters(pairs):
+    errors = []
+    updates = {}
+    for username in sorted({username for username, _ in pairs}):
+        user_data = get_user(username)
+        data_access = user_data["data_access"]
+        compiled_filters, user_errors = compile_row_filters(
+            data_access["row_filters"], data_access.get("compiled_filters", {})
+        )
+        errors.extend(f"{username}: {error}" for error in user_errors)
+        if compiled_filters != data_access.get("compiled_filters", {}):
+            updates[username] = dict(user_data, data_access=dict(data_access, compiled_filters=compiled_filters))
+    if updates:
+        save_many_users(updates)
+    return errors
+
+# Columns of the bulk user CSV: one row per user and table
+USER_CSV_COLUMNS = ["username", "role", "password", "password_sha256", "table", "row_filter"]
+
+# Function to parse a bulk user file into {username: {"role", "password",
+# "tables", "row_filters"}}. CSV files have one row per user and table; JSON
+# files are a list of objects with username, role, tables and row_filters.
+# Passwords may be given in plain text ("password") or as the stored SHA-256
+# hash ("password_sha256"); "password" is None when neither is given.
+def parse_user_import(data, file_format):
+    records = {}
+    if file_format == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        missing = {"username", "table"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"CSV is missing the columns: {', '.join(sorted(missing))}")
+        rows = list(reader)
+    else:
+        rows = []
+        for entry in json.loads(data):
+            if not isinstance(entry, dict) or "username" not in entry:
+                raise ValueError("JSON imports must be a list of objects with a username.")
+            for key in ("username", "role", "password", "password_sha256"):
+                if entry.get(key) is not None and not isinstance(entry[key], str):
+                    raise ValueError(f"{entry['username']}: {key} must be a string.")
+            tables = entry.get("tables", [])
+            if not isinstance(tables, list) or not all(isinstance(t, str) for t in tables):
+                raise ValueError(f"{entry['username']}: tables must be a list of table names.")
+            row_filters = entry.get("row_filters", {})
+            if not isinstance(row_filters, dict) or not all(
+                isinstance(t, str) and isinstance(f, str) for t, f in row_filters.items()
+            ):
+                raise ValueError(f"{entry['username']}: row_filters must map table names to filter strings.")
+            for table_name in dict.fromkeys(tables + list(row_filters)) or [""]:
+                rows.append(dict(entry, table=table_name, row_filter=row_filters.get(table_name, "")))
+    for line, row in enumerate(rows, start=1):
+        username = (row.get("username") or "").strip()
+        if not username:
+            raise ValueError(f"Row {line} has no username.")
+        record = records.setdefault(username, {"role": None, "password": None, "tables": [], "row_filters": {}})
+        if row.get("role"):
+            record["role"] = row["role"].strip()
+        if row.get("password"):
+            record["password"] = hashlib.sha256(row["password"].encode()).hexdigest()
+        elif row.get("password_sha256"):
+            record["password"] = row["password_sha256"].strip()
+        table_name = (row.get("table") or "").strip()
+        if table_name and table_name not in record["tables"]:
+            record["tables"].append(table_name)
+        row_filter = (row.get("row_filter") or "").strip()
+        if table_name and row_filter:
+            record["row_filters"][table_name] = row_filter
+    return records
+
+# Function to apply imported users in one batched write. Each imported user
+# gets the role, password (when given), tables and row filters from the file;
+# column policies for tables still granted and already validated filters are
+# kept. Tables must be in the catalog, and new row filters are validated once
+# per distinct (table, filter) pair, concurrently. Nothing is written when any
+# user, table or filter is rejected. Cached results of every table whose
+# access changed are dropped.
+def import_users(records):
+    users = load_users()
+    errors = []
+    pending = set()
+    known_tables = set(filter_available_tables(
+        list(dict.fromkeys(t for record in records.values() for t in record["tables"]))
+    ))
+    for username, record in records.items():
+        if record["role"] not in (None, "user", "admin"):
+            errors.append(f"{username}: unknown role '{record['role']}'.")
+        if username not in users and record["password"] is None:
+            errors.append(f"{username}: new users need a password.")
+        for table_name in record["tables"]:
+            if table_name not in known_tables:
+                errors.append(f"{username}: table {table_name} is not in the catalog.")
+        previous = users.get(username, {}).get("data_access", {}).get("compiled_filters", {})
+        for table_name, row_filter in record["row_filters"].items():
+            if compiled_predicate(previous.get(table_name), row_filter) is None:
+                pending.add((table_name, row_filter))
+    if errors:
+        return 0, errors
+
+    validated = {}
+    with ThreadPoolExecutor(max_workers=IMPORT_VALIDATION_WORKERS) as pool:
+        futures = {pool.submit(validate_row_filter, table_name, row_filter): (table_name, row_filter)
+                   for table_name, row_filter in pending}
+        for future in as_completed(futures):
+            try:
+                validated[futures[future]] = future.result()
+            except ValueError as e:
+                errors.append(str(e))
+    if errors:
+        return 0, sorted(errors)
+
+    updates = {}
+    changed_tables = set()
+    for username, record in records.items():
+        existing = users.get(username)
+        data_access = existing["data_access"] if existing else {}
+        previous = data_access.get("compiled_filters", {})
+        compiled_filters = {}
+        for table_name, row_filter in record["row_filters"].items():
+            if compiled_predicate(previous.get(table_name), row_filter) is not None:
+                compiled_filters[table_name] = previous[table_name]
+            else:
+                compiled_filters[table_name] = {"source": row_filter, "predicate": validated[(table_name, row_filter)]}
+        updates[username] = {
+            "password": record["password"] or existing["password"],
+            "role": record["role"] or (existing["role"] if existing else "user"),
+            "data_access": {
+                "tables": record["tables"],
+                "row_filters": record["row_filters"],
+                "compiled_filters": compiled_filters,
+                "columns": {
+                    table_name: policy for table_name, policy in data_access.get("columns", {}).items()
+                    if table_name in record["tables"]
+                }
+            }
+        }
+        changed_tables.update(access_changed_tables(existing, updates[username]))
+    save_many_users(updates)
+    # Drop cached results for tables whose access changed
+    for table_name in changed_tables:
+        get_result_cache().invalidate_table(table_name)
+    return len(updates), []
+
+# Function to list the tables whose access differs between two versions of a
+# user (None for a new user): grants, row filters and column policies, or
+# every table of either version when the role changed
+def access_changed_tables(old_user, new_user):
+    old_access = old_user.get("data_access", {}) if old_user else {}
+    new_access = new_user.get("data_access", {})
+    old_tables = set(old_access.get("tables", []))
+    new_tables = set(new_access.get("tables", []))
+    if old_user is None or old_user["role"] != new_user["role"]:
+        return old_tables | new_tables
+    changed = old_tables ^ new_tables
+    for key in ("row_filters", "columns"):
+        old_values = old_access.get(key, {})
+        new_values = new_access.get(key, {})
+        changed.update(t for t in set(old_values) | set(new_values) if old_values.get(t) != new_values.get(t))
+    return changed
+
+# Function to export every user's role, password hash, tables and row filters
+# in the format parse_user_import reads
+def export_users(file_format):
+    users = load_users()
+    if file_format == "json":
+        return json.dumps([
+            {
+                "username": username,
+                "role": user_data["role"],
+                "password_sha256": user_data["password"],
+                "tables": user_data["data_access"].get("tables", []),
+                "row_filters": user_data["data_access"].get("row_filters", {})
+            }
+            for username, user_data in sorted(users.items())
+        ], indent=2)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(USER_CSV_COLUMNS)
+    for username, user_data in sorted(users.items()):
+        data_access = user_data["data_access"]
+        row_filters = data_access.get("row_filters", {})
+        for table_name in dict.fromkeys(data_access.get("tables", []) + list(row_filters)) or [""]:
+            writer.writerow([username, user_data["role"], "", user_data["password"],
+                             table_name, row_filters.get(table_name, "")])
+    return out.getvalue()
+
 # Function to handle user data access management
 def user_data_access_management():
     st.subheader("User Data Access Management")
-    users = load_users()
     
-    # Select user to manage
-    non_admin_users = [u for u in users.keys() if users[u]["role"] != "admin" or u == "admin"]
-    selected_user = st.selectbox("Select User", non_admin_users)
+    # Filters saved before validation existed block their users' queries until
+    # validated. Finding them scans every user, so it only runs on request.
+    with st.expander("Unvalidated row filters"):
+        if st.button("Find unvalidated filters"):
+            st.session_state.unvalidated_filters = unvalidated_row_filters(load_users())
+        unvalidated = st.session_state.get("unvalidated_filters")
+        if unvalidated:
+            st.warning(f"{len(unvalidated)} stored row filters have not been validated; queries using them are blocked.")
+            if st.button("Validate stored filters"):
+                for error in validate_stored_row_filters(unvalidated):
+                    st.error(error)
+                st.session_state.unvalidated_filters = unvalidated_row_filters(load_users())
+        elif unvalidated is not None:
+            st.success("Every stored row filter has been validated.")
+    
+    # Select user to manage, from the users matching a search
+    search = st.text_input("Search users", key="access_user_search", placeholder="Username or part of it")
+    page_users, total = search_users(search, 0, USERS_PAGE_SIZE)
+    selected_user = st.selectbox(
+        "Select User",
+        [username for username, role, _, _ in page_users if role != "admin" or username == "admin"]
+    )
+    if total > len(page_users):
+        st.caption(f"Showing the first {len(page_users)} of {total:,} matching users. Search to narrow the list.")
     
     if selected_user:
         st.write(f"Managing data access for: {selected_user}")
         
         # Get current access settings
-        user_data = users[selected_user]
+        user_data = get_user(selected_user)
         if "data_access" not in user_data:
-            user_data["data_access"] = {"tables": [], "row_filters": {}}
+            user_data = dict(user_data, data_access={"tables": [], "row_filters": {}})
         
         # Table access management
         st.subheader("Table Access")
-        available_tables = get_available_tables()
+        refresh_catalog()
+        
+        # The selection is kept in session state so it survives searches,
+        # which change the multiselect's options
+        selection_key = f"table_access_{selected_user}"
+        if selection_key not in st.session_state:
+            st.session_state[selection_key] = filter_available_tables(user_data["data_access"]["tables"])
+        search = st.text_input("Search tables", key=f"table_access_search_{selected_user}",
+                               placeholder="Table name or part of it")
+        matches = get_catalog().search(search, CATALOG_SEARCH_LIMIT)
         
         # Create multiselect for tables
         selected_tables = st.multiselect(
             "Select tables user can access",
-            available_tables,
-            default=[t for t in user_data["data_access"]["tables"] if t in available_tables]
+            list(dict.fromkeys(st.session_state[selection_key] + matches)),
+            default=st.session_state[selection_key]
         )
+        st.session_state[selection_key] = selected_tables
+        st.caption(f"{len(matches)} of {get_catalog().count():,} catalog tables shown; search to find others.")
         
         # Row-level filter management
         st.subheader("Row-Level Filters")
@@ -186,33 +1774,89 @@ def user_data_access_management():
                     filter_condition = filter_condition[6:].strip()
                 row_filters[table] = filter_condition
         
+        # Column-level access management
+        st.subheader("Column Access")
+        st.write("Limit the columns this user can query and choose the columns shown by default. Leave empty to allow all columns.")
+        # One table is edited at a time, since each needs its schema; edits to
+        # the others are kept in session state until the settings are saved
+        policies_key = f"column_access_{selected_user}"
+        if policies_key not in st.session_state:
+            st.session_state[policies_key] = dict(user_data["data_access"].get("columns", {}))
+        edited_policies = st.session_state[policies_key]
+        column_table = st.selectbox("Edit column access for", selected_tables, key=f"column_table_{selected_user}")
+        if column_table:
+            schema_columns = [field["name"] for field in get_table_schema(column_table)]
+            if not schema_columns:
+                st.warning(f"The schema of {column_table} is unavailable; its column access is kept as is.")
+            else:
+                policy = edited_policies.get(column_table, {})
+                allowed_columns = st.multiselect(
+                    f"Allowed columns for {column_table}",
+                    schema_columns,
+                    default=[c for c in policy.get("allowed", []) if c in schema_columns]
+                )
+                default_options = allowed_columns or schema_columns
+                default_columns = st.multiselect(
+                    f"Default columns for {column_table}",
+                    default_options,
+                    default=[c for c in policy.get("default", []) if c in default_options]
+                )
+                if allowed_columns or default_columns:
+                    edited_policies[column_table] = {"allowed": allowed_columns, "default": default_columns}
+                else:
+                    edited_policies.pop(column_table, None)
+        column_policies = {table: policy for table, policy in edited_policies.items() if table in selected_tables}
+        
         # Save changes
         if st.button("Save Access Settings"):
-            users[selected_user]["data_access"]["tables"] = selected_tables
-            users[selected_user]["data_access"]["row_filters"] = row_filters
-            save_users(users)
+            compiled_filters, errors = compile_row_filters(
+                row_filters, user_data["data_access"].get("compiled_filters", {})
+            )
+            if errors:
+                for error in errors:
+                    st.error(error)
+                st.warning("Access settings were not saved. Fix the filters above and save again.")
+                return
+            updated_user = dict(user_data, data_access=dict(
+                user_data["data_access"],
+                tables=selected_tables,
+                row_filters=row_filters,
+                compiled_filters=compiled_filters,
+                columns=column_policies
+            ))
+            save_user(selected_user, updated_user)
+            # Drop cached results for tables whose access changed
+            for table in access_changed_tables(user_data, updated_user):
+                get_result_cache().invalidate_table(table)
             st.success(f"Access settings for {selected_user} updated successfully!")
 
 # Function to handle user management (admin only)
 def user_management():
     st.subheader("User Management")
-    users = load_users()
     
-    # Display existing users with their data access
+    # Display one page of existing users with their data access
     st.write("Existing Users:")
-    user_data = []
-    for username, data in users.items():
-        accessible_tables = len(data.get("data_access", {}).get("tables", []))
-        has_filters = len(data.get("data_access", {}).get("row_filters", {})) > 0
-        user_data.append({
-            "Username": username, 
-            "Role": data["role"],
-            "Tables Access": accessible_tables,
-            "Has Row Filters": "Yes" if has_filters else "No"
-        })
-    
-    user_df = pd.DataFrame(user_data)
+    search = st.text_input("Search users", key="user_search", placeholder="Username or part of it")
+    _, total = search_users(search, 0, 0)
+    pages = max(1, -(-total // USERS_PAGE_SIZE))
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1, key="user_page") if pages > 1 else 1
+    page_users, total = search_users(search, (page - 1) * USERS_PAGE_SIZE, USERS_PAGE_SIZE)
+    user_df = pd.DataFrame(
+        [
+            {
+                "Username": username,
+                "Role": role,
+                "Tables Access": table_count,
+                "Has Row Filters": "Yes" if filter_count else "No"
+            }
+            for username, role, table_count, filter_count in page_users
+        ],
+        columns=["Username", "Role", "Tables Access", "Has Row Filters"]
+    )
     st.dataframe(user_df)
+    if total > len(page_users):
+        first = (page - 1) * USERS_PAGE_SIZE + 1
+        st.caption(f"Showing users {first}-{first + len(page_users) - 1} of {total:,}")
     
     # Create new user
     st.subheader("Add New User")
@@ -222,7 +1866,7 @@ def user_management():
     
     if st.button("Add User"):
         if new_username and new_password:
-            if new_username in users:
+            if get_user(new_username) is not None:
                 st.error(f"User '{new_username}' already exists!")
             else:
                 hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
@@ -231,26 +1875,64 @@ def user_management():
                     "tables": get_available_tables() if new_role == "admin" else [],
                     "row_filters": {}
                 }
-                users[new_username] = {
+                save_user(new_username, {
                     "password": hashed_password, 
                     "role": new_role,
                     "data_access": data_access
-                }
-                save_users(users)
+                })
                 st.success(f"User '{new_username}' added successfully!")
                 st.experimental_rerun()
     
-    # Delete user
+    # Delete user, chosen from the users listed above
     st.subheader("Delete User")
-    delete_username = st.selectbox("Select User to Delete", list(users.keys()))
-    if st.button("Delete User"):
+    delete_username = st.selectbox("Select User to Delete", [username for username, _, _, _ in page_users])
+    if delete_username and st.button("Delete User"):
         if delete_username != "admin":  # Prevent deleting the main admin account
-            del users[delete_username]
-            save_users(users)
+            delete_user(delete_username)
             st.success(f"User '{delete_username}' deleted successfully!")
             st.experimental_rerun()
         else:
             st.error("Cannot delete the main admin account!")
+    
+    render_bulk_user_panel()
+
+# Bulk import and export of users, table grants and row filters
+def render_bulk_user_panel():
+    st.subheader("Bulk Import / Export")
+    st.write(
+        "CSV files have one row per user and table with the columns "
+        f"{', '.join(USER_CSV_COLUMNS)}. JSON files are a list of objects with "
+        "username, role, password or password_sha256, tables and row_filters. "
+        "Imported users replace the tables and row filters of existing users."
+    )
+    uploaded = st.file_uploader("Import users", type=["csv", "json"])
+    if uploaded is not None and st.button("Import users"):
+        file_format = "json" if uploaded.name.lower().endswith(".json") else "csv"
+        try:
+            records = parse_user_import(uploaded.getvalue().decode("utf-8"), file_format)
+        except ValueError as e:
+            st.error(f"Could not read {uploaded.name}: {e}")
+        else:
+            start = time.perf_counter()
+            count, errors = import_users(records)
+            if errors:
+                st.error(f"Nothing was imported; fix these {len(errors)} problems first:")
+                for error in errors[:20]:
+                    st.write(f"- {error}")
+            else:
+                st.success(f"Imported {count:,} users in {time.perf_counter() - start:.1f}s.")
+    
+    export_format = st.selectbox("Export format", ["csv", "json"], key="user_export_format")
+    if st.button("Prepare export"):
+        st.session_state.user_export = (export_format, export_users(export_format))
+    if st.session_state.get("user_export"):
+        file_format, data = st.session_state.user_export
+        st.download_button(
+            "Download users",
+            data,
+            file_name=f"users.{file_format}",
+            mime="application/json" if file_format == "json" else "text/csv"
+        )
 
 # Generate demo data for when tables don't exist
 def get_demo_data(table_name):
@@ -278,9 +1960,8 @@ def get_demo_data(table_name):
 
 # Define your query based on user access
 def get_data():
-    users = load_users()
     username = st.session_state.username
-    user_data = users[username]
+    user_data = get_user(username)
     
     # Admin can see all data
     if user_data["role"] == "admin":
@@ -295,7 +1976,7 @@ def get_data():
         return pd.DataFrame({"message": ["You don't have access to any data tables."]})
     
     # Find the first accessible table
-    accessible_tables = [t for t in data_access["tables"] if t in get_available_tables()]
+    accessible_tables = filter_available_tables(data_access["tables"])
     
     if not accessible_tables:
         return pd.DataFrame({"message": ["None of your accessible tables currently exist."]})
@@ -306,15 +1987,372 @@ def get_data():
     # For demo purposes, return demo data
     return get_demo_data(table_to_query)
 
-# Function to get specific table data (for user with multiple table access)
-def get_table_data(table_name, row_limit=None):
-    if client is None:
+# Strip whitespace and any "WHERE" keyword from a stored row filter
+def normalize_row_filter(row_filter):
+    row_filter = row_filter.strip()
+    if row_filter.upper().startswith("WHERE "):
+        row_filter = row_filter[6:].strip()
+    return row_filter
+
+# Tokens that could end a row filter's predicate early or comment out the rest
+# of the query, when they appear outside quoted strings
+ROW_FILTER_FORBIDDEN_TOKENS = [";", "--", "#", "/*", "*/"]
+
+# The text of a predicate outside quoted strings and identifiers, with each
+# quoted part replaced by a space, and whether every quote was closed
+def unquoted_text(predicate):
+    parts = []
+    quote = None
+    escaped = False
+    for char in predicate:
+        if quote:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+            parts.append(" ")
+        else:
+            parts.append(char)
+    return "".join(parts), quote is None
+
+# Whether the parentheses in a predicate are balanced outside of quoted strings,
+# so the predicate cannot close the parentheses it is wrapped in
+def parentheses_balanced(predicate):
+    text, closed = unquoted_text(predicate)
+    depth = 0
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0 and closed
+
+# Validate a row filter before it is saved: normalize it, reject statement
+# separators and comments, and dry-run it against the table. Returns the
+# compiled (normalized) predicate or raises ValueError with the reason.
+def validate_row_filter(table_name, row_filter):
+    predicate = normalize_row_filter(row_filter)
+    text, _ = unquoted_text(predicate)
+    for token in ROW_FILTER_FORBIDDEN_TOKENS:
+        if token in text:
+            raise ValueError(f"Filter for {table_name} may not contain '{token}'.")
+    if not parentheses_balanced(predicate):
+        raise ValueError(f"Filter for {table_name} has unbalanced parentheses or quotes.")
+    if get_bigquery_client() is None:
+        raise ValueError(f"Filter for {table_name} cannot be validated while BigQuery is not available.")
+    if not table_exists(table_name):
+        raise ValueError(f"Filter for {table_name} cannot be validated: the table does not exist.")
+    
+    from google.cloud import bigquery
+    try:
+        dry_run = get_bigquery_client().query(
+            compile_table_query(table_name, predicate, 0),
+            job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        )
+    except BadRequest as e:
+        raise ValueError(f"Filter for {table_name} is invalid: {e.message}")
+    if dry_run.statement_type != "SELECT":
+        raise ValueError(f"Filter for {table_name} must be a single condition.")
+    return predicate
+
+# Compiled predicate of a stored compiled filter, if it was compiled from the
+# given row filter text
+def compiled_predicate(compiled, row_filter):
+    if compiled is None or compiled.get("source") != row_filter:
+        return None
+    return compiled.get("predicate")
+
+# Function to get the validated row filter a user's queries on a table run
+# with. Returns "" when the user has no filter on the table and raises
+# ValueError when the stored filter was never validated, so queries fail
+# instead of running without it.
+def get_compiled_row_filter(user_data, table_name):
+    data_access = user_data.get("data_access", {})
+    row_filter = data_access.get("row_filters", {}).get(table_name, "")
+    if not row_filter.strip():
+        return ""
+    predicate = compiled_predicate(data_access.get("compiled_filters", {}).get(table_name), row_filter)
+    if predicate is None:
+        raise ValueError(
+            f"The row filter on {table_name} has not been validated. "
+            "Ask an administrator to save it again in Data Access Control."
+        )
+    return predicate
+
+# Build the SQL for a table query with an optional row filter, interactive
+# filter predicates (from compile_filter_predicates), column projection and limit
+def compile_table_query(table_name, row_filter, row_limit, filter_sql="", columns=None):
+    row_filter = normalize_row_filter(row_filter)
+    
+    # The stored row filter is parenthesized so interactive filters can only narrow it
+    conditions = []
+    if row_filter:
+        conditions.append(f"({row_filter})")
+    if filter_sql:
+        conditions.append(filter_sql)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    
+    # Add LIMIT clause only if row_limit is greater than 0
+    limit_clause = f"LIMIT {row_limit}" if row_limit > 0 else ""
+    
+    # Explicit projection so only the needed columns are scanned and transferred
+    projection = ", ".join(quote_identifier(col) for col in columns) if columns else "*"
+    
+    return f"""
+        SELECT {projection}
+        FROM `{table_path(table_name)}`
+        {where_clause}
+        {limit_clause}
+        """
+
+# Quote a column name for use in generated SQL
+def quote_identifier(name):
+    if "`" in name or "\\" in name:
+        raise ValueError(f"Unsupported column name: {name}")
+    return f"`{name}`"
+
+# BigQuery parameter types for legacy schema type names
+PARAMETER_TYPES = {
+    "INTEGER": "INT64",
+    "FLOAT": "FLOAT64",
+    "BOOLEAN": "BOOL",
+}
+
+# Compile interactive filter selections into a parameterized predicate. Lists
+# become IN UNNEST(@array) and (low, high) tuples become BETWEEN @low AND @high.
+def compile_filter_predicates(filters, schema):
+    from google.cloud import bigquery
+    column_types = {
+        field["name"]: PARAMETER_TYPES.get(field["type"], field["type"]) for field in schema
+    }
+    predicates = []
+    query_parameters = []
+    for i, (col, filter_value) in enumerate(filters.items()):
+        column = quote_identifier(col)
+        if isinstance(filter_value, tuple):
+            predicates.append(f"{column} BETWEEN @f{i}_low AND @f{i}_high")
+            query_parameters.append(bigquery.ScalarQueryParameter(f"f{i}_low", "FLOAT64", float(filter_value[0])))
+            query_parameters.append(bigquery.ScalarQueryParameter(f"f{i}_high", "FLOAT64", float(filter_value[1])))
+        else:
+            values = [v.item() if hasattr(v, "item") else v for v in filter_value]
+            predicates.append(f"{column} IN UNNEST(@f{i})")
+            query_parameters.append(
+                bigquery.ArrayQueryParameter(f"f{i}", column_types.get(col, "STRING"), values)
+            )
+    return " AND ".join(predicates), query_parameters
+
+# Name of the materialized table for a (table, row filter) pair
+def materialized_table_name(table_name, row_filter):
+    digest = hashlib.sha256(f"{table_name}\n{row_filter}".encode()).hexdigest()[:12]
+    return f"{MATERIALIZED_DATASET}.{table_name.replace('.', '__')}__{digest}"
+
+# Pick the table to read for a row filter: a fresh materialized table already
+# holds exactly the filtered rows, so it is read without the filter. A table
+# is fresh when it is younger than MATERIALIZED_MAX_AGE and was built after
+# the base table last changed (as of the cached table metadata). Tables in use
+# are rebuilt in the background once older than MATERIALIZED_REBUILD_AGE or
+# when the base table changed.
+def resolve_query_source(table_name, row_filter):
+    row_filter = normalize_row_filter(row_filter)
+    if row_filter:
+        entry = get_table_settings(table_name).get("materialized", {}).get(row_filter)
+        if entry:
+            changed = base_table_changed(table_name, entry)
+            if ((changed or time.time() - entry["built_at"] >= MATERIALIZED_REBUILD_AGE)
+                    and get_bigquery_client() is not None):
+                get_materialized_rebuilder().rebuild(table_name, row_filter)
+            if not changed and time.time() - entry["built_at"] < MATERIALIZED_MAX_AGE:
+                return entry["target"], ""
+    return table_name, row_filter
+
+# Whether a table was modified after its materialized table was built
+def base_table_changed(table_name, entry):
+    modified = get_table_metadata(table_name)["modified"]
+    return modified is not None and modified > entry["built_at"]
+
+# Rebuilds materialized tables in the background as queries use them, so the
+# tables users read stay fresh without an admin rebuilding them. A pair is
+# rebuilt by one worker at a time, and not retried for MATERIALIZED_REBUILD_AGE
+# seconds after a failed rebuild.
+class MaterializedRebuilder:
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="materialize")
+        self._running = set()
+        self._failed_at = {}
+        self._lock = threading.Lock()
+    
+    def rebuild(self, table_name, row_filter):
+        pair = (table_name, row_filter)
+        with self._lock:
+            if pair in self._running or time.time() - self._failed_at.get(pair, 0) < MATERIALIZED_REBUILD_AGE:
+                return
+            self._running.add(pair)
+        self._executor.submit(self._run, pair)
+    
+    def _run(self, pair):
+        try:
+            build_materialized_table(*pair)
+        except Exception as e:
+            logger.warning("Rebuilding the filtered table for %s failed: %s", pair[0], e)
+            with self._lock:
+                self._failed_at[pair] = time.time()
+        finally:
+            with self._lock:
+                self._running.discard(pair)
+
+# One background rebuilder shared by every session in this process
+@st.cache_resource
+def get_materialized_rebuilder():
+    return MaterializedRebuilder(MATERIALIZED_REBUILD_WORKERS)
+
+# Distinct (table, row filter) pairs across regular users, with their users
+def collect_row_filter_pairs():
+    pairs = {}
+    for username, user_data in load_users().items():
+        if user_data["role"] == "admin":
+            continue
+        data_access = user_data.get("data_access", {})
+        for table_name in data_access.get("row_filters", {}):
+            try:
+                row_filter = get_compiled_row_filter(user_data, table_name)
+            except ValueError:
+                continue  # Unvalidated filters are never queried
+            if row_filter and table_name in data_access.get("tables", []):
+                pairs.setdefault((table_name, row_filter), []).append(username)
+    return pairs
+
+# Build (or rebuild) the materialized table for a (table, row filter) pair.
+# The table expires on its own if it stops being refreshed.
+def build_materialized_table(table_name, row_filter):
+    from google.cloud import bigquery
+    client = get_bigquery_client()
+    target = materialized_table_name(table_name, row_filter)
+    client.create_dataset(f"{PROJECT_ID}.{MATERIALIZED_DATASET}", exists_ok=True)
+    expiration_hours = 2 * MATERIALIZED_MAX_AGE // 3600
+    query = f"""
+        CREATE OR REPLACE TABLE `{table_path(target)}`
+        OPTIONS (expiration_timestamp = TIMESTAMP_ADD(CURRENT_TIMESTAMP(), INTERVAL {expiration_hours} HOUR))
+        AS {compile_table_query(table_name, row_filter, 0)}
+        """
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=MAX_BYTES_BILLED["admin"])
+    run_query_job(client, query, job_config, table_name)
+    
+    built_at = time.time()
+    def add_materialized(table_settings):
+        materialized = dict(table_settings.get("materialized", {}))
+        materialized[row_filter] = {"target": target, "built_at": built_at}
+        table_settings["materialized"] = materialized
+        return table_settings
+    update_table_settings(table_name, add_materialized)
+    get_table_metadata_cache().invalidate(target)
+    get_result_cache().invalidate_table(table_name)
+    return target
+
+# Forget materialized tables whose (table, row filter) pair is no longer used
+def prune_materialized_tables(pairs):
+    def drop_unused(table_name):
+        def fn(table_settings):
+            materialized = table_settings.get("materialized", {})
+            kept = {f: entry for f, entry in materialized.items() if (table_name, f) in pairs}
+            if kept:
+                table_settings["materialized"] = kept
+            else:
+                table_settings.pop("materialized", None)
+            return table_settings
+        return fn
+    
+    for table_name, table_settings in list(get_table_settings_store().settings().items()):
+        materialized = table_settings.get("materialized", {})
+        if any((table_name, f) not in pairs for f in materialized):
+            update_table_settings(table_name, drop_unused(table_name))
+
+# Admin screen for the materialized per-filter tables
+def materialized_tables_management():
+    st.subheader("Filtered Tables")
+    st.write(
+        "Each distinct table and row filter pair can be materialized into a smaller table. "
+        "Users with that filter then read the filtered table instead of scanning the full table. "
+        f"Filtered tables in use are rebuilt in the background every {MATERIALIZED_REBUILD_AGE // 60} minutes "
+        "and when their table changes; one that could not be rebuilt within "
+        f"{MATERIALIZED_MAX_AGE // 60} minutes is bypassed."
+    )
+    # Collecting the pairs scans every user, so it only runs on request
+    if st.button("Find row filter pairs"):
+        st.session_state.row_filter_pairs = collect_row_filter_pairs()
+    pairs = st.session_state.get("row_filter_pairs")
+    if pairs is None:
+        return
+    if not pairs:
+        st.info("No users have row filters.")
+        return
+    
+    rows = []
+    stale_pairs = []
+    for (table_name, row_filter), usernames in sorted(pairs.items()):
+        entry = get_table_settings(table_name).get("materialized", {}).get(row_filter)
+        age = time.time() - entry["built_at"] if entry else None
+        fresh = age is not None and age < MATERIALIZED_MAX_AGE and not base_table_changed(table_name, entry)
+        if not fresh:
+            stale_pairs.append((table_name, row_filter))
+        metadata = get_table_metadata(entry["target"]) if entry else None
+        rows.append({
+            "Table": table_name,
+            "Row Filter": row_filter,
+            "Users": len(usernames),
+            "Filtered Table": entry["target"] if entry else "",
+            "Age (minutes)": round(age / 60) if age is not None else None,
+            "Status": "Fresh" if fresh else ("Stale" if entry else "Not built"),
+            "Rows": metadata["num_rows"] if metadata and metadata["exists"] else None,
+            "Size": format_bytes(metadata["num_bytes"]) if metadata and metadata["num_bytes"] is not None else "",
+        })
+    st.dataframe(pd.DataFrame(rows))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        build_stale = st.button(f"Build stale filtered tables ({len(stale_pairs)})", disabled=not stale_pairs)
+    with col2:
+        rebuild_all = st.button("Rebuild all filtered tables")
+    if build_stale or rebuild_all:
+        if get_bigquery_client() is None:
+            st.error("BigQuery client is not available.")
+            return
+        targets = list(pairs) if rebuild_all else stale_pairs
+        progress = st.progress(0.0)
+        for i, (table_name, row_filter) in enumerate(targets):
+            try:
+                build_materialized_table(table_name, row_filter)
+            except Exception as e:
+                st.error(f"Failed to build filtered table for {table_name} ({row_filter}): {str(e)}")
+            progress.progress((i + 1) / len(targets))
+        prune_materialized_tables(pairs)
+        st.success(f"Built {len(targets)} filtered tables.")
+
+# Resolve the projection for a table query: the requested columns restricted to
+# the user's allowed columns, falling back to their default columns. Returns
+# None for SELECT *.
+def resolve_columns(table_name, user_data, requested=None):
+    policy = user_data.get("data_access", {}).get("columns", {}).get(table_name, {})
+    allowed = policy.get("allowed", []) if user_data["role"] != "admin" else []
+    columns = requested or policy.get("default") or allowed
+    if allowed:
+        columns = [col for col in columns if col in allowed] or allowed
+    return list(columns) or None
+
+# Function to get specific table data (for user with multiple table access).
+# Interactive filters are compiled into the query and evaluated in BigQuery.
+def get_table_data(table_name, row_limit=None, filters=None, columns=None):
+    if get_bigquery_client() is None:
         st.warning("BigQuery client is not available. Using demo data instead.")
         return get_demo_data(table_name)
     
-    users = load_users()
     username = st.session_state.username
-    user_data = users[username]
+    user_data = get_user(username)
     data_access = user_data.get("data_access", {"tables": [], "row_filters": {}})
     
     # Check if user has access to this table
@@ -326,73 +2364,57 @@ def get_table_data(table_name, row_limit=None):
         st.warning(f"Table {table_name} does not exist in BigQuery. Using demo data instead.")
         return get_demo_data(table_name)
     
+    # Split table name into project, dataset and table
+    if split_table_name(table_name) is None:
+        st.error(f"Invalid table name format: {table_name}. Expected format: dataset.table or project.dataset.table")
+        return get_demo_data(table_name)
+    
+    # Queries only ever run with the row filter as validated when it was saved
     try:
-        # Apply row filter if exists - make sure not to include 'WHERE' in the filter itself
-        row_filter = data_access["row_filters"].get(table_name, "").strip()
-        
-        # Remove any "WHERE" keyword that might be in the filter itself
-        if row_filter.upper().startswith("WHERE "):
-            row_filter = row_filter[6:].strip()
-            
-        where_clause = f"WHERE {row_filter}" if row_filter else ""
-        
-        # Split table name into dataset and table
-        parts = table_name.split('.')
-        if len(parts) != 2:
-            st.error(f"Invalid table name format: {table_name}. Expected format: dataset.table")
-            return get_demo_data(table_name)
-            
-        dataset_id, table_id = parts
+        row_filter = get_compiled_row_filter(user_data, table_name)
+    except ValueError as e:
+        return pd.DataFrame({"message": [str(e)]})
+    
+    # Default row limit based on user role
+    if row_limit is None:
+        # Admins get all data by default, users get 100 rows
+        row_limit = 0 if st.session_state.role == "admin" else USER_DEFAULT_ROW_LIMIT
+    
+    try:
+        filter_sql, query_parameters = compile_filter_predicates(
+            filters or {}, get_table_schema(table_name)
+        )
+        columns = resolve_columns(table_name, user_data, columns)
         
-        # Default row limit based on user role
-        if row_limit is None:
-            # Admins get all data by default, users get 100 rows
-            row_limit = 0 if st.session_state.role == "admin" else 100
+        # Users whose row filter has a fresh materialized table read that instead
+        source_table, source_filter = resolve_query_source(table_name, row_filter)
         
-        # Add LIMIT clause only if row_limit is greater than 0
-        limit_clause = f"LIMIT {row_limit}" if row_limit > 0 else ""
+        # Full reads of append-only tables only fetch rows past the last watermark
+        watermark_column = get_table_settings(table_name).get("watermark_column")
+        if row_limit == 0 and not filters and watermark_column:
+            return run_incremental_query(table_name, row_filter, columns, watermark_column)
         
-        query = f"""
-        SELECT *
-        FROM `bigquery-basics-460109.{dataset_id}.{table_id}`
-        {where_clause}
-        {limit_clause}
-        """
+        query = compile_table_query(source_table, source_filter, row_limit, filter_sql, columns)
         
         # Log the query for debugging (only visible to admins)
         if st.session_state.role == "admin":
             with st.expander("Show SQL Query"):
                 st.code(query, language="sql")
         
-        return client.query(query).to_dataframe()
+        cost_message = check_query_cost(query, table_name, query_parameters)
+        if cost_message:
+            return pd.DataFrame({"message": [cost_message]})
+        
+        return run_cached_query(
+            query, table_name, query_parameters, MAX_BYTES_BILLED.get(st.session_state.role)
+        )
     except NotFound:
         st.warning(f"Table {table_name} not found. Using demo data instead.")
         return get_demo_data(table_name)
     except BadRequest as e:
-        st.error(f"Query error: {str(e)}")
-        # If there's a syntax error in the filter, try without it
-        if row_filter:
-            st.warning("Filter syntax is invalid. Trying query without filters...")
-            try:
-                # Add LIMIT clause only if row_limit is greater than 0
-                limit_clause = f"LIMIT {row_limit}" if row_limit > 0 else ""
-                
-                query = f"""
-                SELECT *
-                FROM `bigquery-basics-460109.{dataset_id}.{table_id}`
-                {limit_clause}
-                """
-                
-                # Log the query for debugging (only visible to admins)
-                if st.session_state.role == "admin":
-                    with st.expander("Show SQL Query"):
-                        st.code(query, language="sql")
-                        
-                return client.query(query).to_dataframe()
-            except Exception as inner_e:
-                st.error(f"Still failed: {str(inner_e)}")
-                return get_demo_data(table_name)
-        return get_demo_data(table_name)
+        # Never retry without the row filter: that would scan, and show, the whole table
+        logger.warning("Query on %s for %s failed: %s", table_name, username, e)
+        return pd.DataFrame({"message": [f"Query error: {e.message}"]})
     except Forbidden as e:
         st.error(f"Access denied to BigQuery table: {str(e)}")
         return get_demo_data(table_name)
@@ -400,16 +2422,943 @@ def get_table_data(table_name, row_limit=None):
         st.error(f"Error querying table {table_name}: {str(e)}")
         return get_demo_data(table_name)
 
+# Frames of append-only tables kept between refreshes, with the highest
+# watermark seen and the time of the last full read. Frames are keyed by query
+# and watermark column and bounded by count and bytes; a frame over the byte
+# budget is not kept, so reads of that table take the normal query path.
+class IncrementalFrameStore:
+    def __init__(self, max_frames, max_bytes):
+        self.max_frames = max_frames
+        self.max_bytes = max_bytes
+        self._states = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+            return state
+
+    # Keep a frame; returns False when it is over the byte budget and was dropped
+    def put(self, key, table_name, frame, watermark_column, reconciled_at):
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        watermark = frame[watermark_column].max() if len(frame) else None
+        with self._lock:
+            if key in self._states:
+                self._bytes -= self._states.pop(key)["bytes"]
+            if nbytes > self.max_bytes:
+                return False
+            self._states[key] = {
+                "table_name": table_name,
+                "frame": frame,
+                "bytes": nbytes,
+                "watermark": None if pd.isna(watermark) else watermark,
+                "reconciled_at": reconciled_at,
+            }
+            self._bytes += nbytes
+            while len(self._states) > self.max_frames or self._bytes > self.max_bytes:
+                self._bytes -= self._states.popitem(last=False)[1]["bytes"]
+            return True
+    
+    # Drop every frame of a table, e.g. when its watermark column changes
+    def invalidate_table(self, table_name):
+        with self._lock:
+            for key in [k for k, state in self._states.items() if state["table_name"] == table_name]:
+                self._bytes -= self._states.pop(key)["bytes"]
+
+# One incremental frame store shared by every session in this process
+@st.cache_resource
+def get_incremental_store():
+    return IncrementalFrameStore(INCREMENTAL_MAX_FRAMES, INCREMENTAL_MAX_BYTES)
+
+# Read an append-only table. The first read and a periodic reconcile fetch the
+# whole result; in between, only rows whose watermark column is past the last
+# seen value are fetched and appended to the kept frame.
+def run_incremental_query(table_name, row_filter, columns, watermark_column):
+    if columns and watermark_column not in columns:
+        columns = columns + [watermark_column]
+    query = compile_table_query(table_name, row_filter, 0, columns=columns)
+    
+    # Log the query for debugging (only visible to admins)
+    if st.session_state.role == "admin":
+        with st.expander("Show SQL Query"):
+            st.code(query, language="sql")
+    
+    cache = get_result_cache()
+    df = cache.get(query)
+    if df is not None:
+        return df
+    
+    maximum_bytes_billed = MAX_BYTES_BILLED.get(st.session_state.role)
+    store = get_incremental_store()
+    # With SELECT * the query does not name the watermark column, so it is part of the key
+    store_key = (query, watermark_column)
+    state = store.get(store_key)
+    if (state is None or state["watermark"] is None
+            or time.time() - state["reconciled_at"] > INCREMENTAL_RECONCILE_INTERVAL):
+        cost_message = check_query_cost(query, table_name)
+        if cost_message:
+            return pd.DataFrame({"message": [cost_message]})
+        df = run_cached_query(query, table_name, None, maximum_bytes_billed)
+        store.put(store_key, table_name, df, watermark_column, time.time())
+        return df
+    
+    from google.cloud import bigquery
+    column_types = {
+        field["name"]: PARAMETER_TYPES.get(field["type"], field["type"])
+        for field in get_table_schema(table_name)
+    }
+    watermark = state["watermark"]
+    if isinstance(watermark, pd.Timestamp):
+        watermark = watermark.to_pydatetime()
+    elif hasattr(watermark, "item"):
+        watermark = watermark.item()
+    delta_query = compile_table_query(
+        table_name, row_filter, 0, f"{quote_identifier(watermark_column)} > @watermark", columns
+    )
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ScalarQueryParameter("watermark", column_types.get(watermark_column), watermark)
+        ],
+        maximum_bytes_billed=maximum_bytes_billed
+    )
+    client = get_bigquery_client()
+    
+    def refresh():
+        _, rows = run_query_job(client, delta_query, job_config, table_name)
+        with timed("to_dataframe", table_name):
+            delta = fetch_frame(rows)
+        frame = state["frame"]
+        if len(delta):
+            frame = pd.concat([frame, delta], ignore_index=True)
+            if COMPACT_FRAMES:
+                # Categories or integer widths may differ between the two frames
+                frame = compact_frame(frame)
+        store.put(store_key, table_name, frame, watermark_column, state["reconciled_at"])
+        cache.put(query, table_name, frame)
+        return frame
+    
+    return get_query_flights().do(f"incremental\n{watermark_column}\n{query}", refresh)
+
+# Paged view over a query result. The query runs once; pages are then read
+# from its result table with list_rows, so moving between pages never re-runs
+# the query and only a small LRU window of pages is held in memory.
+class PagedResult:
+    def __init__(self, query, page_size, window, maximum_bytes_billed=None, query_parameters=None):
+        self.query = query
+        self.query_parameters = query_parameters or []
+        self.page_size = page_size
+        self.window = window
+        from google.cloud import bigquery
+        # Waits for the job; rows are only downloaded when iterated
+        job, rows = run_query_job(
+            get_bigquery_client(),
+            query,
+            bigquery.QueryJobConfig(maximum_bytes_billed=maximum_bytes_billed, query_parameters=self.query_parameters)
+        )
+        self._destination = job.destination
+        self._schema = rows.schema
+        self.total_rows = rows.total_rows
+        self._pages = OrderedDict()
+
+    @property
+    def num_pages(self):
+        return max(1, -(-self.total_rows // self.page_size))
+
+    def page(self, index):
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+        df = fetch_frame(get_bigquery_client().list_rows(
+            self._destination,
+            selected_fields=self._schema,
+            start_index=index * self.page_size,
+            max_results=self.page_size
+        ))
+        self._pages[index] = df
+        while len(self._pages) > self.window:
+            self._pages.popitem(last=False)
+        return df
+
+# Function to get a paged result for an unlimited table query. Returns None when
+# paging is not possible (no client, or a missing or inaccessible table), so
+# callers can fall back to get_table_data's demo data and messages, or a
+# message frame when the query is blocked by the cost guardrails or fails.
+def get_paged_table_data(table_name, columns=None, filters=None):
+    if get_bigquery_client() is None or split_table_name(table_name) is None or not table_exists(table_name):
+        return None
+    
+    user_data = get_user(st.session_state.username)
+    data_access = user_data.get("data_access", {"tables": [], "row_filters": {}})
+    if table_name not in data_access["tables"] and user_data["role"] != "admin":
+        return None
+    
+    # Interactive filters are compiled into the paged query and evaluated in BigQuery
+    try:
+        query, query_parameters = compile_user_table_query(table_name, user_data, 0, filters, columns)
+    except ValueError as e:
+        return pd.DataFrame({"message": [str(e)]})
+    paged = st.session_state.get("paged_result")
+    if paged is None or paged.query != query or paged.query_parameters != query_parameters:
+        try:
+            cost_message = check_query_cost(query, table_name, query_parameters)
+            if cost_message:
+                return pd.DataFrame({"message": [cost_message]})
+            paged = PagedResult(
+                query, PAGE_SIZE, PAGE_WINDOW, MAX_BYTES_BILLED.get(user_data["role"]), query_parameters
+            )
+        except Exception as e:
+            # Report the error rather than let the caller fall back to loading the whole table
+            logger.warning("Paged query on %s failed: %s", table_name, e)
+            return pd.DataFrame({"message": [f"Error querying table {table_name}: {str(e)}"]})
+        # Only the current paged result is kept per session
+        st.session_state.paged_result = paged
+        st.session_state.page_index = 0
+    return paged
+
+# Render one page of a paged result with navigation controls
+def render_paged_result(paged):
+    page_index = min(st.session_state.get("page_index", 0), paged.num_pages - 1)
+    
+    def move_page(step):
+        st.session_state.page_index = page_index + step
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Previous page", on_click=move_page, args=(-1,), disabled=page_index == 0)
+    with col2:
+        st.write(f"Page {page_index + 1} of {paged.num_pages}")
+    with col3:
+        st.button("Next page", on_click=move_page, args=(1,), disabled=page_index >= paged.num_pages - 1)
+    
+    df = paged.page(page_index)
+    render_rows(df)
+    start = page_index * paged.page_size
+    st.write(f"Showing records {start + 1}-{start + len(df)} of {paged.total_rows}")
+
+# Sort key that orders categoricals by their values rather than by the order
+# their categories were first seen
+def table_sort_key(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.reorder_categories(sorted(series.cat.categories), ordered=True)
+    return series
+
+# Function to get the row positions of a frame sorted by one column. The order
+# is kept in the session for the frame object it was computed for, so moving
+# between windows does not sort again.
+def sorted_positions(df, key, sort_column, descending):
+    cached = st.session_state.get(f"{key}_order")
+    if cached is not None and cached[0]() is df and cached[1:3] == (sort_column, descending):
+        return cached[3]
+    series = table_sort_key(df[sort_column]).reset_index(drop=True)
+    positions = series.sort_values(ascending=not descending, na_position="last", kind="stable").index.to_numpy()
+    st.session_state[f"{key}_order"] = (weakref.ref(df), sort_column, descending, positions)
+    return positions
+
+# Function to summarize a frame per column, shown instead of rows that are
+# too large to send to the browser
+def summarize_frame(df):
+    return pd.DataFrame({
+        "column": df.columns,
+        "type": [str(dtype) for dtype in df.dtypes],
+        "non-null": df.count().to_numpy(),
+        "first value": [str(df[col].iloc[0]) if len(df) else "" for col in df.columns],
+    })
+
+# Function to show rows, or a column summary when they exceed the payload budget
+def render_rows(df):
+    # A slice of a categorical column still carries every category
+    categoricals = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if categoricals:
+        df = df.assign(**{col: df[col].cat.remove_unused_categories() for col in categoricals})
+    payload = int(df.memory_usage(deep=True).sum())
+    if payload > TABLE_PAYLOAD_BUDGET:
+        st.info(
+            f"The rows in view take {format_bytes(payload)}, more than the "
+            f"{format_bytes(TABLE_PAYLOAD_BUDGET)} display budget. Showing a column summary instead."
+        )
+        st.dataframe(summarize_frame(df))
+    else:
+        st.dataframe(df)
+
+# Render a frame as a sortable window of TABLE_WINDOW_ROWS rows. Sorting runs
+# on the server and only the rows in view are serialized, so the payload does
+# not grow with the size of the frame.
+def render_table(df, key):
+    if len(df) <= TABLE_WINDOW_ROWS:
+        render_rows(df)
+        return
+    
+    def reset_window():
+        st.session_state[f"{key}_window"] = 0
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        sort_column = st.selectbox(
+            "Sort by", [None] + list(df.columns), key=f"{key}_sort", on_change=reset_window,
+            format_func=lambda col: "(original order)" if col is None else str(col)
+        )
+    with col2:
+        descending = st.checkbox("Descending", key=f"{key}_descending", on_change=reset_window)
+    
+    num_windows = -(-len(df) // TABLE_WINDOW_ROWS)
+    window_index = min(st.session_state.get(f"{key}_window", 0), num_windows - 1)
+    
+    def move_window(step):
+        st.session_state[f"{key}_window"] = window_index + step
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("Previous rows", key=f"{key}_previous", on_click=move_window, args=(-1,), disabled=window_index == 0)
+    with col2:
+        st.write(f"Rows {window_index * TABLE_WINDOW_ROWS + 1:,}-{min((window_index + 1) * TABLE_WINDOW_ROWS, len(df)):,} of {len(df):,}")
+    with col3:
+        st.button("Next rows", key=f"{key}_next", on_click=move_window, args=(1,), disabled=window_index >= num_windows - 1)
+    
+    start = window_index * TABLE_WINDOW_ROWS
+    if sort_column is None or sort_column not in df.columns:
+        window = df.iloc[start:start + TABLE_WINDOW_ROWS]
+    else:
+        window = df.iloc[sorted_positions(df, key, sort_column, descending)[start:start + TABLE_WINDOW_ROWS]]
+    render_rows(window)
+
+# Filter engine for fetched frames. Column statistics (distinct values of
+# text columns, numeric ranges) are computed once per frame and cached by a
+# content fingerprint, low-cardinality text columns are converted to
+# categoricals, and filters are applied as one combined boolean mask.
+class FilterEngine:
+    def __init__(self, max_frames):
+        self.max_frames = max_frames
+        self._profiles = OrderedDict()  # fingerprint -> profile
+        self._fingerprints = {}  # id(df) -> (weakref to df, fingerprint)
+        self._lock = threading.Lock()
+
+    def prepare(self, df):
+        fingerprint = self._fingerprint(df)
+        with self._lock:
+            profile = self._profiles.get(fingerprint)
+            if profile is not None:
+                self._profiles.move_to_end(fingerprint)
+                return profile
+        profile = self._profile(df)
+        with self._lock:
+            self._profiles[fingerprint] = profile
+            while len(self._profiles) > self.max_frames:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def apply(self, profile, filters):
+        frame = profile["frame"]
+        mask = np.ones(len(frame), dtype=bool)
+        for col, filter_value in filters.items():
+            series = frame[col]
+            if isinstance(filter_value, tuple):
+                values = series.to_numpy(dtype="float64", na_value=np.nan)
+                mask &= (values >= filter_value[0]) & (values <= filter_value[1])
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                # Compare integer category codes instead of strings
+                wanted = series.cat.categories.get_indexer(filter_value)
+                mask &= np.isin(series.cat.codes.to_numpy(), wanted[wanted >= 0])
+            else:
+                mask &= series.isin(filter_value).to_numpy()
+        if mask.all():
+            return frame
+        return frame[mask]
+
+    def _fingerprint(self, df):
+        # Frames served from the result cache are the same object on every
+        # rerun, so the content hash is only computed once per object
+        with self._lock:
+            known = self._fingerprints.get(id(df))
+        if known is not None and known[0]() is df:
+            return known[1]
+        try:
+            hashed = pd.util.hash_pandas_object(df, index=False).to_numpy()
+            digest = hashlib.sha1(hashed.tobytes())
+            digest.update(repr(list(df.columns)).encode())
+            fingerprint = digest.hexdigest()
+        except TypeError:
+            fingerprint = f"id:{id(df)}"  # Unhashable cell values (e.g. arrays)
+        key = id(df)
+        with self._lock:
+            self._fingerprints[key] = (
+                weakref.ref(df, lambda _, key=key: self._fingerprints.pop(key, None)),
+                fingerprint
+            )
+        return fingerprint
+
+    def _profile(self, df):
+        columns = {}
+        converted = {}
+        for col in df.columns:
+            series = df[col]
+            if series.dtype == 'object' or isinstance(series.dtype, pd.CategoricalDtype):  # Text columns
+                unique_values = series.dropna().unique()
+                if len(unique_values) < FILTER_MAX_OPTIONS:
+                    columns[col] = {"kind": "text", "options": list(unique_values)}
+                if (series.dtype == 'object' and len(series)
+                        and len(unique_values) / len(series) < CATEGORY_MAX_RATIO):
+                    try:
+                        converted[col] = series.astype("category")
+                    except TypeError:
+                        pass  # Unhashable values stay as objects
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):  # Numeric columns
+                # All-null nullable columns (e.g. Int64) have a pd.NA minimum that float() rejects
+                if pd.isna(series.min()):
+                    continue
+                min_val = float(series.min())
+                max_val = float(series.max())
+                if min_val != max_val:
+                    columns[col] = {"kind": "numeric", "min": min_val, "max": max_val}
+        frame = df.assign(**converted) if converted else df
+        return {"frame": frame, "columns": columns}
+
+# One filter engine shared by every session in this process
+@st.cache_resource
+def get_filter_engine():
+    return FilterEngine(FILTER_CACHE_FRAMES)
+
+# Function to prepare a fetched frame for filtering (cached per frame content)
+def prepare_filter_frame(df):
+    with timed("filtering"):
+        return get_filter_engine().prepare(df)
+
+# Function to apply filter selections to a prepared frame in one pass
+def apply_filters(profile, filters):
+    with timed("filtering"):
+        return get_filter_engine().apply(profile, filters)
+
+# BigQuery types profiled as numeric or text columns
+NUMERIC_TYPES = {"INTEGER", "INT64", "FLOAT", "FLOAT64", "NUMERIC", "BIGNUMERIC"}
+TEXT_TYPES = {"STRING"}
+
+# Profile the columns of a user's filtered table in BigQuery: min/max for
+# numeric columns, null counts, APPROX_COUNT_DISTINCT and APPROX_TOP_COUNT
+# values for text columns. Returns column statistics in the same form as the
+# filter engine, or None when the profiling query would be too expensive.
+@st.cache_data(ttl=COLUMN_PROFILE_TTL, show_spinner=False)
+def get_column_profile(table_name, row_filter, columns, role):
+    from google.cloud import bigquery
+    source_table, source_filter = resolve_query_source(table_name, row_filter)
+    fields = [
+        field for field in get_table_schema(table_name)
+        if field["name"] in columns and field["mode"] != "REPEATED"
+        and field["type"] in NUMERIC_TYPES | TEXT_TYPES
+    ]
+    if not fields:
+        return {}
+    
+    expressions = []
+    for i, field in enumerate(fields):
+        column = quote_identifier(field["name"])
+        expressions.append(f"COUNTIF({column} IS NULL) AS c{i}_nulls")
+        expressions.append(f"APPROX_COUNT_DISTINCT({column}) AS c{i}_distinct")
+        if field["type"] in NUMERIC_TYPES:
+            expressions.append(f"MIN({column}) AS c{i}_min")
+            expressions.append(f"MAX({column}) AS c{i}_max")
+        else:
+            expressions.append(f"APPROX_TOP_COUNT({column}, {FILTER_MAX_OPTIONS}) AS c{i}_top")
+    where_clause = f"WHERE {source_filter}" if source_filter else ""
+    query = f"""
+        SELECT {", ".join(expressions)}
+        FROM `{table_path(source_table)}`
+        {where_clause}
+        """
+    
+    # Profiles are a convenience; skip them rather than ask for confirmation
+    estimated_bytes = estimate_query_bytes(query, query)
+    limit = min(MAX_BYTES_BILLED.get(role) or CONFIRM_BYTES_THRESHOLD, CONFIRM_BYTES_THRESHOLD)
+    if estimated_bytes > limit:
+        logger.info("Skipping column profile of %s: %d bytes", table_name, estimated_bytes)
+        return None
+    job_config = bigquery.QueryJobConfig(maximum_bytes_billed=limit)
+    _, rows = run_query_job(get_bigquery_client(), query, job_config, table_name)
+    row = next(iter(rows))
+    
+    column_stats = {}
+    for i, field in enumerate(fields):
+        stats = {"nulls": row[f"c{i}_nulls"], "distinct": row[f"c{i}_distinct"]}
+        if field["type"] in NUMERIC_TYPES:
+            if row[f"c{i}_min"] is None or row[f"c{i}_min"] == row[f"c{i}_max"]:
+                continue
+            stats.update(kind="numeric", min=float(row[f"c{i}_min"]), max=float(row[f"c{i}_max"]))
+        else:
+            if stats["distinct"] >= FILTER_MAX_OPTIONS:
+                continue
+            options = [top["value"] for top in row[f"c{i}_top"] if top["value"] is not None]
+            stats.update(kind="text", options=options)
+        column_stats[field["name"]] = stats
+    return column_stats
+
+# Whether a fetched frame holds every row its query can return
+def frame_is_complete(df, row_limit):
+    return row_limit == 0 or len(df) < row_limit
+
+# Column statistics for the filter widgets. A complete frame already has exact
+# statistics; a frame cut off by the row limit is profiled in BigQuery so the
+# widgets cover every row, not just the fetched ones.
+def get_filter_column_stats(table_name, row_limit, profile):
+    df = profile["frame"]
+    if frame_is_complete(df, row_limit) or get_bigquery_client() is None or not table_exists(table_name):
+        return profile["columns"]
+    try:
+        row_filter = get_compiled_row_filter(get_user(st.session_state.username), table_name)
+        column_stats = get_column_profile(table_name, row_filter, tuple(df.columns), st.session_state.role)
+    except Exception as e:
+        logger.info("Column profile of %s failed: %s", table_name, e)
+        return profile["columns"]
+    return column_stats if column_stats is not None else profile["columns"]
+
+# Column statistics for filtering a paged result. No page holds every row, so
+# the columns are always profiled in BigQuery; returns {} (no filter widgets)
+# when the profile is unavailable or too expensive.
+def get_paged_filter_column_stats(table_name, columns):
+    if get_bigquery_client() is None or not table_exists(table_name):
+        return {}
+    user_data = get_user(st.session_state.username)
+    try:
+        row_filter = get_compiled_row_filter(user_data, table_name)
+        columns = resolve_columns(table_name, user_data, columns) or [
+            field["name"] for field in get_table_schema(table_name)
+        ]
+        column_stats = get_column_profile(table_name, row_filter, tuple(columns), st.session_state.role)
+    except Exception as e:
+        logger.info("Column profile of %s failed: %s", table_name, e)
+        return {}
+    return column_stats or {}
+
+# Build the interactive filter widgets from column statistics and return only
+# the selections that narrow the data: {column: [values]} or {column: (low, high)}
+def render_filter_panel(column_stats):
+    st.subheader("Filter Data")
+    filters = {}
+    with st.expander("Show filters", expanded=False):
+        # Create filters for each column based on its statistics
+        for col, stats in column_stats.items():
+            if stats["kind"] == "text":
+                selected = st.multiselect(
+                    f"Filter by {col}",
+                    options=stats["options"],
+                    default=stats["options"]
+                )
+                if selected and len(selected) < len(stats["options"]):
+                    filters[col] = list(selected)
+            else:
+                selected = st.slider(
+                    f"Filter by {col}",
+                    stats["min"], stats["max"],
+                    (stats["min"], stats["max"])
+                )
+                if selected != (stats["min"], stats["max"]):
+                    filters[col] = selected
+    return filters
+
+# Admin panel showing the catalog's size and refreshing it on demand
+def render_catalog_panel():
+    catalog = get_catalog()
+    with st.expander("Table catalog"):
+        st.write(f"{catalog.count():,} tables from {len(CATALOG_SOURCES)} configured sources")
+        if catalog.refreshed_at:
+            st.caption(f"Last refreshed {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(catalog.refreshed_at))}")
+        client = get_bigquery_client()
+        col1, col2 = st.columns(2)
+        force = col2.button("Re-list all datasets", disabled=client is None)
+        if col1.button("Refresh changed datasets", disabled=client is None) or force:
+            stats = catalog.refresh(client, CATALOG_SOURCES, force=force)
+            st.success(
+                f"Checked {stats['datasets']} datasets, re-listed {stats['listed']}, removed {stats['removed']}."
+            )
+            for error in stats["errors"]:
+                st.error(error)
+
+# Table selectbox with search. Offers at most CATALOG_SEARCH_LIMIT tables
+# matching the search text, from the given list or from the whole catalog,
+# and warms metadata only for the tables offered.
+def table_picker(label, key, table_names=None):
+    total = get_catalog().count() if table_names is None else len(table_names)
+    search = ""
+    if total > CATALOG_SEARCH_LIMIT:
+        search = st.text_input("Search tables", key=f"{key}_search", placeholder="Table name or part of it")
+    if table_names is None:
+        options = get_catalog().search(search, CATALOG_SEARCH_LIMIT)
+    else:
+        options = search_table_names(table_names, search, CATALOG_SEARCH_LIMIT)
+    if len(options) < total:
+        st.caption(f"Showing {len(options)} of {total:,} tables. Search to narrow the list.")
+    warm_table_metadata(options)
+    return st.selectbox(label, options, key=key)
+
+# Let the user pick which columns to query, from the cached table schema.
+# Returns None when the selection is the user's default columns (every column
+# when there is no default) so the query uses the default or stays SELECT *.
+def render_column_picker(table_name, user_data):
+    schema_columns = [field["name"] for field in get_table_schema(table_name)]
+    if not schema_columns:
+        return None
+    
+    policy = user_data.get("data_access", {}).get("columns", {}).get(table_name, {})
+    options = schema_columns
+    if user_data["role"] != "admin" and policy.get("allowed"):
+        options = [col for col in schema_columns if col in policy["allowed"]]
+    default = resolve_columns(table_name, user_data) or options
+    
+    selected = st.multiselect(
+        "Columns to display",
+        options,
+        default=[col for col in options if col in default]
+    )
+    selected = [col for col in options if col in selected]
+    if not selected or selected == [col for col in options if col in default]:
+        return None
+    return selected
+
+# Apply filter selections. When the fetched frame already holds every row the
+# query can return (no limit, or fewer rows than the limit) and for demo data,
+# filtering happens in memory; otherwise the filters run in BigQuery so they
+# see rows beyond the limit.
+def get_filtered_table_data(table_name, row_limit, profile, filters, columns=None):
+    if not filters:
+        return profile["frame"]
+    if (frame_is_complete(profile["frame"], row_limit) or get_bigquery_client() is None
+            or not table_exists(table_name)):
+        return apply_filters(profile, filters)
+    return get_table_data(table_name, row_limit=row_limit, filters=filters, columns=columns)
+
+# Compile the SQL and parameters a user's table query runs with: their row
+# filter (or its materialized table), interactive filters and columns
+def compile_user_table_query(table_name, user_data, row_limit, filters=None, columns=None):
+    row_filter = get_compiled_row_filter(user_data, table_name)
+    filter_sql, query_parameters = compile_filter_predicates(filters or {}, get_table_schema(table_name))
+    source_table, source_filter = resolve_query_source(table_name, row_filter)
+    query = compile_table_query(
+        source_table, source_filter, row_limit, filter_sql, resolve_columns(table_name, user_data, columns)
+    )
+    return query, query_parameters
+
+# A background export of a query result to a CSV or Parquet file. Rows are
+# read page by page from the result iterator and appended to the file, so
+# memory use does not grow with the size of the result.
+class ExportJob:
+    def __init__(self, username, table_name, file_format, query, query_parameters, maximum_bytes_billed):
+        self.username = username
+        self.table_name = table_name
+        self.file_format = file_format
+        self.query = query
+        self.query_parameters = query_parameters
+        self.maximum_bytes_billed = maximum_bytes_billed
+        self.id = hashlib.sha256(f"{username}{table_name}{time.time()}".encode()).hexdigest()[:12]
+        extension = "parquet" if file_format == "Parquet" else "csv"
+        self.file_name = f"{table_name.replace('.', '_')}_{self.id}.{extension}"
+        self.path = os.path.join(EXPORT_DIR, self.file_name)
+        self.status = "queued"  # "queued", "running", "done" or "failed"
+        self.error = ""
+        self.rows_written = 0
+        self.total_rows = None
+        self.started_at = time.time()
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_written / self.total_rows, 1.0)
+
+    def run(self, client):
+        from google.cloud import bigquery
+        self.status = "running"
+        try:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=self.query_parameters or [],
+                maximum_bytes_billed=self.maximum_bytes_billed
+            )
+            _, rows = run_query_job(
+                client, self.query, job_config, self.table_name, self.username, page_size=EXPORT_PAGE_SIZE
+            )
+            self.total_rows = rows.total_rows
+            if self.file_format == "Parquet":
+                self._write_parquet(rows)
+            else:
+                self._write_csv(rows)
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.warning("Export of %s for %s failed: %s", self.table_name, self.username, e)
+
+    def _write_csv(self, rows):
+        with open(self.path, "w", newline="") as f:
+            for i, page in enumerate(rows.to_dataframe_iterable()):
+                page.to_csv(f, header=i == 0, index=False)
+                self.rows_written += len(page)
+
+    def _write_parquet(self, rows):
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for batch in rows.to_arrow_iterable():
+                if writer is None:
+                    writer = pq.ParquetWriter(self.path, batch.schema)
+                writer.write_batch(batch)
+                self.rows_written += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            # Empty result: still write a valid file
+            import pyarrow as pa
+            pq.write_table(pa.table({}), self.path)
+
+# Runs export jobs on a small thread pool and keeps the latest jobs per user
+class ExportManager:
+    def __init__(self, max_workers, jobs_per_user, connection):
+        self.jobs_per_user = jobs_per_user
+        self._connection = connection
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs = {}  # username -> list of ExportJob, newest first
+        self._lock = threading.Lock()
+
+    def start(self, job):
+        with self._lock:
+            jobs = self._jobs.setdefault(job.username, [])
+            jobs.insert(0, job)
+            # Drop the oldest finished exports and their files
+            for old_job in [j for j in jobs[self.jobs_per_user:] if j.status in ("done", "failed")]:
+                jobs.remove(old_job)
+                if os.path.exists(old_job.path):
+                    os.remove(old_job.path)
+        self._executor.submit(job.run, self._connection.client())
+
+    def jobs(self, username):
+        with self._lock:
+            return list(self._jobs.get(username, []))
+    
+    # Forget an export and delete its file, e.g. once it has been downloaded
+    def remove(self, job):
+        with self._lock:
+            jobs = self._jobs.get(job.username, [])
+            if job in jobs:
+                jobs.remove(job)
+        if os.path.exists(job.path):
+            os.remove(job.path)
+
+# One export manager shared by every session in this process
+@st.cache_resource
+def get_export_manager():
+    return ExportManager(EXPORT_WORKERS, EXPORT_JOBS_PER_USER, get_bigquery_connection())
+
+# Forget a downloaded export: its file and the bytes read for the download
+def finish_export_download(job):
+    get_export_manager().remove(job)
+    st.session_state.pop(f"export_data_{job.id}", None)
+
+# Export controls: start a streaming export of the current query (row filter,
+# interactive filters and columns, without the display row limit) and list
+# the user's exports with their progress. A finished export is only read into
+# memory when its download is prepared, and deleted once it is downloaded.
+def render_export_panel(table_name, filters, columns):
+    with st.expander("Export data"):
+        if get_bigquery_client() is None or not table_exists(table_name):
+            st.info("Export is only available for BigQuery tables.")
+            return
+        
+        user_data = get_user(st.session_state.username)
+        file_format = st.radio("Format", ["CSV", "Parquet"], horizontal=True, key="export_format")
+        # The export stays pending across reruns until it starts or is cancelled,
+        # so the cost check's confirmation checkbox keeps its state
+        if st.button("Start export"):
+            st.session_state.pending_export = (table_name, file_format)
+        pending = st.session_state.get("pending_export")
+        if pending is not None:
+            if pending != (table_name, file_format) or st.button("Cancel export"):
+                st.session_state.pop("pending_export")
+            else:
+                try:
+                    query, query_parameters = compile_user_table_query(table_name, user_data, 0, filters, columns)
+                except ValueError as e:
+                    st.session_state.pop("pending_export")
+                    st.warning(str(e))
+                    return
+                cost_message = check_query_cost(query, table_name, query_parameters)
+                if cost_message:
+                    st.warning(cost_message)
+                else:
+                    st.session_state.pop("pending_export")
+                    get_export_manager().start(ExportJob(
+                        st.session_state.username, table_name, file_format, query, query_parameters,
+                        MAX_BYTES_BILLED.get(user_data["role"])
+                    ))
+        
+        jobs = get_export_manager().jobs(st.session_state.username)
+        if jobs:
+            st.button("Refresh export status")
+        for job in jobs:
+            st.write(f"{job.table_name} ({job.file_format}): {job.status}, {job.rows_written:,} rows")
+            if job.status == "failed":
+                st.error(job.error)
+            elif job.status == "done":
+                data_key = f"export_data_{job.id}"
+                if data_key not in st.session_state and st.button(
+                    f"Prepare download of {job.file_name}", key=f"prepare_{job.id}"
+                ):
+                    try:
+                        with open(job.path, "rb") as f:
+                            st.session_state[data_key] = f.read()
+                    except FileNotFoundError:
+                        st.warning(f"{job.file_name} is no longer available; export it again.")
+                        get_export_manager().remove(job)
+                if data_key in st.session_state:
+                    st.download_button(
+                        f"Download {job.file_name}",
+                        data=st.session_state[data_key],
+                        file_name=job.file_name,
+                        key=f"download_{job.id}",
+                        on_click=finish_export_download,
+                        args=(job,)
+                    )
+            else:
+                st.progress(job.progress)
+
+# Memory held by the frames each session is displaying, so the effect of
+# frame compaction and row limits can be seen across sessions
+class SessionMemoryTracker:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._sessions = {}  # session id -> (username, {label: bytes}, updated_at)
+        self._lock = threading.Lock()
+
+    def record(self, session_id, username, frames):
+        usage = {label: int(df.memory_usage(deep=True).sum()) for label, df in frames.items()}
+        with self._lock:
+            self._sessions[session_id] = (username, usage, time.time())
+        return usage
+
+    def report(self):
+        # Sessions end without notice, so idle ones are dropped after the TTL
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for session_id in [k for k, v in self._sessions.items() if v[2] < cutoff]:
+                del self._sessions[session_id]
+            return [
+                {"session": session_id[:8], "user": username, "bytes": sum(usage.values()), **usage}
+                for session_id, (username, usage, _) in self._sessions.items()
+            ]
+
+# One memory tracker shared by every session in this process
+@st.cache_resource
+def get_session_memory_tracker():
+    return SessionMemoryTracker(SESSION_MEMORY_TTL)
+
+# Function to record and show the memory of the frames this session displays
+def show_frame_memory(frames):
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    usage = get_session_memory_tracker().record(st.session_state.session_id, st.session_state.username, frames)
+    st.caption("DataFrame memory: " + ", ".join(f"{label} {format_bytes(n)}" for label, n in usage.items()))
+
+# Show how many records are displayed
+def show_record_count(filtered_df, df, filters):
+    if filters:
+        st.write(f"Showing {len(filtered_df)} records matching the filters ({len(df)} without filters)")
+    else:
+        st.write(f"Showing {len(df)} records")
+
+# Warms the result cache with a user's tables on a bounded thread pool. The
+# pool size caps prefetch queries across all users, and each user has at most
+# PREFETCH_PER_USER queries running; the rest wait in a per-user queue.
+class Prefetcher:
+    def __init__(self, max_workers, per_user_limit, connection, cache, flights):
+        self.per_user_limit = per_user_limit
+        self._connection = connection
+        self._cache = cache
+        self._flights = flights
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._pending = {}  # username -> deque of (query, table_name, maximum_bytes_billed)
+        self._running = {}  # username -> number of queries running
+        self._lock = threading.Lock()
+
+    def prefetch(self, username, tasks):
+        with self._lock:
+            queue = self._pending.setdefault(username, deque())
+            queue.extend(task for task in tasks if not self._cache.contains(task[0]))
+            self._submit(username)
+
+    def _submit(self, username):
+        queue = self._pending.get(username)
+        while queue and self._running.get(username, 0) < self.per_user_limit:
+            self._running[username] = self._running.get(username, 0) + 1
+            self._executor.submit(self._run, username, queue.popleft())
+        if not queue:
+            self._pending.pop(username, None)
+
+    def _run(self, username, task):
+        query, table_name, maximum_bytes_billed = task
+        try:
+            client = self._connection.client()
+            if client is None or self._cache.contains(query):
+                return
+            # Only prefetch queries that would run without confirmation
+            from google.cloud import bigquery
+            estimate = client.query(
+                query, job_config=bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+            ).total_bytes_processed or 0
+            if estimate > min(maximum_bytes_billed or estimate, CONFIRM_BYTES_THRESHOLD):
+                logger.info("Skipping prefetch of %s for %s: %d bytes", table_name, username, estimate)
+                return
+            execute_query(
+                client, self._cache, self._flights, query, table_name, None, maximum_bytes_billed, username
+            )
+        except Exception as e:
+            logger.info("Prefetch of %s for %s failed: %s", table_name, username, e)
+        finally:
+            with self._lock:
+                self._running[username] -= 1
+                if not self._running[username]:
+                    del self._running[username]
+                self._submit(username)
+
+# One prefetcher shared by every session in this process
+@st.cache_resource
+def get_prefetcher():
+    return Prefetcher(
+        PREFETCH_WORKERS, PREFETCH_PER_USER,
+        get_bigquery_connection(), get_result_cache(), get_query_flights()
+    )
+
+# Queue the first PREFETCH_TABLES tables a user can access, compiled exactly as
+# get_table_data compiles them with the default row limit and columns
+def prefetch_user_tables(username, user_data, tables):
+    tasks = []
+    for table_name in tables[:PREFETCH_TABLES]:
+        if split_table_name(table_name) is None or not table_exists(table_name):
+            continue
+        try:
+            row_filter = get_compiled_row_filter(user_data, table_name)
+        except ValueError:
+            continue
+        source_table, source_filter = resolve_query_source(table_name, row_filter)
+        query = compile_table_query(
+            source_table,
+            source_filter,
+            USER_DEFAULT_ROW_LIMIT,
+            columns=resolve_columns(table_name, user_data)
+        )
+        tasks.append((query, table_name, MAX_BYTES_BILLED.get(user_data["role"])))
+    if tasks:
+        get_prefetcher().prefetch(username, tasks)
+
 # Main dashboard content for users
 def user_view():
     st.title('User Dashboard')
     st.write(f"Welcome, {st.session_state.username}!")
     
     # Get user's accessible tables
-    users = load_users()
-    user_data = users[st.session_state.username]
+    user_data = get_user(st.session_state.username)
     data_access = user_data.get("data_access", {"tables": [], "row_filters": {}})
-    accessible_tables = [t for t in data_access["tables"] if t in get_available_tables()]
+    accessible_tables = filter_available_tables(data_access["tables"])
     
     if not accessible_tables:
         st.warning("You don't have access to any data tables. Please contact an administrator.")
@@ -421,89 +3370,167 @@ def user_view():
         st.dataframe(df)
         return
     
+    # Warm the user's tables once per session so switching tables is served from memory
+    if PREFETCH_ENABLED and not st.session_state.get("prefetch_started"):
+        st.session_state.prefetch_started = True
+        if get_bigquery_client() is not None:
+            prefetch_user_tables(st.session_state.username, user_data, accessible_tables)
+    
     # Let user select which table to view
-    selected_table = st.selectbox("Select table to view", accessible_tables)
+    selected_table = table_picker("Select table to view", "user_table_picker", accessible_tables)
     
     # Row limit control (default 100 for users)
-    row_limit = st.slider("Maximum rows to display", min_value=10, max_value=1000, value=100, step=10)
+    row_limit = st.slider("Maximum rows to display", min_value=10, max_value=1000, value=USER_DEFAULT_ROW_LIMIT, step=10)
     
     if selected_table:
+        columns = render_column_picker(selected_table, user_data)
         st.subheader(f'Data from {selected_table}')
-        df = get_table_data(selected_table, row_limit=row_limit)
+        df = get_table_data(selected_table, row_limit=row_limit, columns=columns)
         
         # Check if the result is an error message
         if 'message' in df.columns and len(df.columns) == 1:
             st.warning(df['message'].iloc[0])
         else:
             # Add interactive filters for the data
-            st.subheader("Filter Data")
-            with st.expander("Show filters", expanded=False):
-                filter_columns = {}
-                
-                # Create filters for each column based on data type
-                for col in df.columns:
-                    if df[col].dtype == 'object':  # Text columns
-                        unique_values = df[col].dropna().unique()
-                        if len(unique_values) < 10:  # Only show multiselect for columns with fewer unique values
-                            filter_columns[col] = st.multiselect(
-                                f"Filter by {col}",
-                                options=unique_values,
-                                default=list(unique_values)
-                            )
-                    elif pd.api.types.is_numeric_dtype(df[col]):  # Numeric columns
-                        min_val = float(df[col].min())
-                        max_val = float(df[col].max())
-                        filter_columns[col] = st.slider(
-                            f"Filter by {col}",
-                            min_val, max_val,
-                            (min_val, max_val)
-                        )
-            
-            # Apply filters
-            filtered_df = df.copy()
-            for col, filter_value in filter_columns.items():
-                if filter_value:
-                    if isinstance(filter_value, list):  # For multiselect
-                        if filter_value and len(filter_value) < len(df[col].dropna().unique()):
-                            filtered_df = filtered_df[filtered_df[col].isin(filter_value)]
-                    elif isinstance(filter_value, tuple) and len(filter_value) == 2:  # For sliders
-                        filtered_df = filtered_df[(filtered_df[col] >= filter_value[0]) & 
-                                                 (filtered_df[col] <= filter_value[1])]
+            profile = prepare_filter_frame(df)
+            filters = render_filter_panel(get_filter_column_stats(selected_table, row_limit, profile))
+            filtered_df = get_filtered_table_data(selected_table, row_limit, profile, filters, columns)
             
             # Show filtered data
-            st.dataframe(filtered_df)
-            st.write(f"Showing {len(filtered_df)} of {len(df)} records")
+            with timed("rendering", selected_table):
+                render_table(filtered_df, "user_table")
+            show_record_count(filtered_df, df, filters)
+            show_frame_memory({"fetched": df, "filtered": filtered_df})
+            render_export_panel(selected_table, filters, columns)
             
             # Show applied row-level filters if any
             row_filter = data_access["row_filters"].get(selected_table, "")
             if row_filter:
                 st.info(f"Note: Data is also filtered with predefined condition: {row_filter}")
 
+# Function to show recent rerun timings and the slowest BigQuery jobs
+def performance_dashboard():
+    st.subheader("Performance")
+    recorder = get_perf_recorder()
+    since = time.time() - PERF_RECENT_SECONDS
+    
+    st.write(f"Rerun phases in the last {PERF_RECENT_SECONDS // 60} minutes")
+    phases = recorder.phase_percentiles(since)
+    if phases:
+        st.dataframe(pd.DataFrame([
+            {
+                "phase": phase,
+                "count": stats["count"],
+                "p50 ms": stats["p50"] * 1000,
+                "p95 ms": stats["p95"] * 1000,
+                "p99 ms": stats["p99"] * 1000,
+            }
+            for phase, stats in phases.items()
+        ]))
+    else:
+        st.info("No timings recorded yet.")
+    
+    queries = pd.DataFrame(recorder.queries(since))
+    if len(queries):
+        queries["username"] = queries["username"].replace("", "(background)")
+        queries["table"] = queries["table"].fillna("")
+        st.write("Slowest queries by user and table")
+        st.dataframe(
+            queries.groupby(["username", "table"]).agg(
+                queries=("seconds", "size"),
+                p95_seconds=("seconds", lambda s: s.quantile(0.95)),
+                max_seconds=("seconds", "max"),
+                bytes_billed=("bytes_billed", "sum"),
+                slot_ms=("slot_ms", "sum"),
+                cache_hits=("cache_hit", "sum"),
+            ).sort_values("max_seconds", ascending=False).reset_index()
+        )
+        st.write("Slowest queries")
+        slowest = queries.nlargest(20, "seconds").assign(time=lambda q: pd.to_datetime(q["timestamp"], unit="s"))
+        st.dataframe(slowest[[
+            "time", "username", "table", "seconds", "bytes_processed", "bytes_billed", "slot_ms", "cache_hit", "job_id"
+        ]])
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Export JSON lines", recorder.to_jsonl(), file_name="dashboard_perf.jsonl",
+                           mime="application/x-ndjson")
+    with col2:
+        st.download_button("Export Prometheus metrics", recorder.to_prometheus(), file_name="dashboard_perf.prom",
+                           mime="text/plain")
+    with col3:
+        if st.button("Clear timings"):
+            recorder.clear()
+
 # Main dashboard content for admins
 def admin_view():
     st.title('Admin Dashboard')
     st.write(f"Welcome, {st.session_state.username} (Admin)!")
     
     # Tabs for different admin sections
-    tab1, tab2, tab3 = st.tabs(["Data View", "User Management", "Data Access Control"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Data View", "User Management", "Data Access Control", "Performance"])
     
     with tab1:
         st.subheader('BigQuery Data Explorer')
         
         # Check if BigQuery client is available
-        if client is None:
+        if get_bigquery_client() is None:
             st.error("BigQuery client could not be initialized. Check your credentials.")
             st.info("Showing demo data for demonstration purposes.")
         
         # Let admin select which table to view
-        available_tables = get_available_tables()
+        catalog_stats = refresh_catalog()
+        if catalog_stats and catalog_stats["errors"]:
+            st.warning(f"Some datasets could not be listed: {'; '.join(catalog_stats['errors'][:3])}")
         
-        if not available_tables:
+        render_catalog_panel()
+        
+        if get_catalog().count() == 0:
             st.warning("No tables found in BigQuery. Check your project and dataset configuration.")
             st.info("Showing demo tables for demonstration.")
-            available_tables = ["demo_table_1", "demo_table_2", "demo_table_3"]
+            selected_table = st.selectbox("Select table to view", ["demo_table_1", "demo_table_2", "demo_table_3"])
+        else:
+            selected_table = table_picker("Select table to view", "admin_table_picker")
         
-        selected_table = st.selectbox("Select table to view", available_tables)
+        # Table details from the metadata cache, available before any data is fetched
+        if selected_table:
+            metadata = get_table_metadata(selected_table)
+            if metadata["exists"]:
+                with st.expander("Table details"):
+                    col1, col2, col3 = st.columns(3)
+                    # Row count and size are not reported for views and external tables
+                    col1.metric("Rows", f"{metadata['num_rows']:,}" if metadata["num_rows"] is not None else "n/a")
+                    col2.metric("Size", format_bytes(metadata["num_bytes"]) if metadata["num_bytes"] is not None else "n/a")
+                    col3.metric("Partitioning", metadata["partitioning"] or "None")
+                    st.dataframe(pd.DataFrame(metadata["schema"]))
+                    
+                    # Append-only tables are refreshed incrementally by a watermark column
+                    table_settings = get_table_settings(selected_table)
+                    schema_columns = [field["name"] for field in metadata["schema"]]
+                    append_only = st.checkbox(
+                        "Append-only table",
+                        value=bool(table_settings.get("watermark_column")),
+                        help="Unlimited reads without paging fetch only rows past the last seen watermark value. "
+                             "Paged results are always read from BigQuery a page at a time."
+                    )
+                    current_watermark = table_settings.get("watermark_column")
+                    watermark_column = st.selectbox(
+                        "Watermark column (e.g. ingestion timestamp or increasing ID)",
+                        schema_columns,
+                        index=schema_columns.index(current_watermark) if current_watermark in schema_columns else 0,
+                        disabled=not append_only
+                    )
+                    if st.button("Save table settings"):
+                        def set_watermark(table_settings):
+                            if append_only and watermark_column:
+                                table_settings["watermark_column"] = watermark_column
+                            else:
+                                table_settings.pop("watermark_column", None)
+                            return table_settings
+                        update_table_settings(selected_table, set_watermark)
+                        get_result_cache().invalidate_table(selected_table)
+                        get_incremental_store().invalidate_table(selected_table)
+                        st.success(f"Settings for {selected_table} saved.")
         
         # Row limit control for admin (default to 0 which means no limit)
         col1, col2 = st.columns([1, 1])
@@ -515,58 +3542,84 @@ def admin_view():
         # Calculate actual row limit value
         actual_row_limit = row_limit if use_limit else 0
         
-        if selected_table:
+        # Unlimited queries are paged by default so the whole table is never loaded at once
+        paged_mode = not use_limit and st.checkbox(
+            "Page through results",
+            value=True,
+            help=f"Load {PAGE_SIZE} rows at a time instead of the whole table."
+        )
+        
+        columns = render_column_picker(selected_table, get_user(st.session_state.username)) if selected_table else None
+        
+        # Paged results are filtered in BigQuery, with widgets from a server-side column profile
+        filters = {}
+        if selected_table and paged_mode:
+            filters = render_filter_panel(get_paged_filter_column_stats(selected_table, columns))
+        
+        paged = get_paged_table_data(selected_table, columns, filters) if selected_table and paged_mode else None
+        if isinstance(paged, pd.DataFrame):
             st.subheader(f'Data from {selected_table}')
-            df = get_table_data(selected_table, row_limit=actual_row_limit)
+            st.warning(paged['message'].iloc[0])
+        elif paged is not None:
+            st.subheader(f'Data from {selected_table}')
+            with st.expander("Show SQL Query"):
+                st.code(paged.query, language="sql")
+            with timed("rendering", selected_table):
+                render_paged_result(paged)
+            render_export_panel(selected_table, filters, columns)
+        elif selected_table:
+            st.subheader(f'Data from {selected_table}')
+            df = get_table_data(selected_table, row_limit=actual_row_limit, columns=columns)
             
             # Check if the result is an error message
             if 'message' in df.columns and len(df.columns) == 1:
                 st.warning(df['message'].iloc[0])
             else:
                 # Add interactive filters for the data
-                st.subheader("Filter Data")
-                with st.expander("Show filters", expanded=False):
-                    filter_columns = {}
-                    
-                    # Create filters for each column based on data type
-                    for col in df.columns:
-                        if df[col].dtype == 'object':  # Text columns
-                            unique_values = df[col].dropna().unique()
-                            if len(unique_values) < 10:  # Only show multiselect for columns with fewer unique values
-                                filter_columns[col] = st.multiselect(
-                                    f"Filter by {col}",
-                                    options=unique_values,
-                                    default=list(unique_values)
-                                )
-                        elif pd.api.types.is_numeric_dtype(df[col]):  # Numeric columns
-                            min_val = float(df[col].min())
-                            max_val = float(df[col].max())
-                            filter_columns[col] = st.slider(
-                                f"Filter by {col}",
-                                min_val, max_val,
-                                (min_val, max_val)
-                            )
-                
-                # Apply filters
-                filtered_df = df.copy()
-                for col, filter_value in filter_columns.items():
-                    if filter_value:
-                        if isinstance(filter_value, list):  # For multiselect
-                            if filter_value and len(filter_value) < len(df[col].dropna().unique()):
-                                filtered_df = filtered_df[filtered_df[col].isin(filter_value)]
-                        elif isinstance(filter_value, tuple) and len(filter_value) == 2:  # For sliders
-                            filtered_df = filtered_df[(filtered_df[col] >= filter_value[0]) & 
-                                                     (filtered_df[col] <= filter_value[1])]
+                profile = prepare_filter_frame(df)
+                filters = render_filter_panel(get_filter_column_stats(selected_table, actual_row_limit, profile))
+                filtered_df = get_filtered_table_data(selected_table, actual_row_limit, profile, filters, columns)
                 
                 # Show filtered data
-                st.dataframe(filtered_df)
-                st.write(f"Showing {len(filtered_df)} of {len(df)} records")
+                with timed("rendering", selected_table):
+                    render_table(filtered_df, "admin_table")
+                show_record_count(filtered_df, df, filters)
+                show_frame_memory({"fetched": df, "filtered": filtered_df})
+                render_export_panel(selected_table, filters, columns)
+        
+        # Shared result cache statistics for sizing the cache
+        with st.expander("Result cache"):
+            stats = get_result_cache().stats()
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hits", stats["hits"])
+            col2.metric("Misses", stats["misses"])
+            col3.metric("Hit rate", f"{stats['hit_rate']:.0%}")
+            st.write(
+                f"{stats['entries']} entries using {format_bytes(stats['bytes'])} "
+                f"of {format_bytes(stats['max_bytes'])}, {stats['evictions']} evictions, "
+                f"{get_query_flights().coalesced} queries coalesced with an identical running query"
+            )
+            if st.button("Clear result cache"):
+                get_result_cache().clear()
+        
+        # Per-session memory of displayed frames
+        with st.expander("Session memory"):
+            sessions = get_session_memory_tracker().report()
+            if sessions:
+                st.write(f"{len(sessions)} active sessions holding {format_bytes(sum(s['bytes'] for s in sessions))}")
+                st.dataframe(pd.DataFrame(sessions))
+            else:
+                st.write("No session has displayed data yet.")
     
     with tab2:
         user_management()
     
     with tab3:
         user_data_access_management()
+        materialized_tables_management()
+    
+    with tab4:
+        performance_dashboard()
 
 # Main app layout
 def main():
@@ -602,17 +3655,19 @@ def main():
         st.title("Welcome to Dashboard")
         st.write("Please login to access the dashboard.")
         
-        # Display connection status
-        if client is None:
+        # Display the connection status kept up to date by the background checker
+        connection = get_bigquery_connection()
+        connection.start_health_refresher()
+        if connection.status == "unknown":
+            st.info("Checking BigQuery connection...")
+        elif connection.status == "connected":
+            st.success("Connected to BigQuery successfully.")
+        elif connection.status == "unavailable":
             st.error("BigQuery connection not available. The dashboard will operate in demo mode.")
         else:
-            try:
-                # Test the connection by listing datasets
-                list(client.list_datasets())
-                st.success("Connected to BigQuery successfully.")
-            except Exception as e:
-                st.error(f"BigQuery connection test failed: {str(e)}")
-                st.info("The dashboard will operate in demo mode.")
+            st.error(connection.message)
+            st.info("The dashboard will operate in demo mode.")
 
 if __name__ == "__main__":
-    main()
+    with timed("rerun"):
+        main()
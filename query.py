@@ -1,37 +1,132 @@
+# Sample sentences report. Streams the query result page by page and writes
+# each word with its first sentences as CSV, JSONL or a text table, so output
+# starts with the first page and memory stays flat however many words match.
+#
+#   python query.py
+#   python query.py --format csv --sentence-count 5 --output sentences.csv
+import argparse
+import csv
+import json
+import sys
+
 from google.cloud import bigquery
-import pandas as pd
-from tabulate import tabulate
 
-# Initialize the BigQuery client
-client = bigquery.Client(project='bigquery-basics-460109')
+# Report source
+PROJECT_ID = 'bigquery-basics-460109'
+TABLE_ID = f'{PROJECT_ID}.rawc_data.rawc_table'
+
+# Report defaults
+SENTENCE_COUNT = 3
+PAGE_SIZE = 1000  # Rows fetched per result page
+TABLE_COLUMN_WIDTH = 40  # Text table cells are padded or truncated to this width
 
-# Define your SQL query
-query = """
-    SELECT word, ARRAY_AGG(sentence1 LIMIT 3) AS sentences
+# Define your SQL query; rn limits each word to @sentence_count sentences
+QUERY = """
+    SELECT word, ARRAY_AGG(sentence1 ORDER BY rn) AS sentences
     FROM (
         SELECT word, sentence1,
                ROW_NUMBER() OVER (PARTITION BY word ORDER BY sentence1) as rn
-        FROM `bigquery-basics-460109.rawc_data.rawc_table`
+        FROM `{table_id}`
     )
-    WHERE rn <= 3
+    WHERE rn <= @sentence_count
     GROUP BY word
 """
 
-# Execute the query
-query_job = client.query(query)
+# Function to stream report rows: the word followed by exactly
+# sentence_count sentences, padded with empty strings for rarer words
+def report_rows(client, table_id, sentence_count, page_size):
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("sentence_count", "INT64", sentence_count)]
+    )
+    query_job = client.query(QUERY.format(table_id=table_id), job_config=job_config)
+    padding = [""] * sentence_count
+    for row in query_job.result(page_size=page_size):
+        sentences = list(row["sentences"] or [])[:sentence_count]
+        yield [row["word"]] + sentences + padding[len(sentences):]
+
+# Writer for comma-separated output
+class CsvWriter:
+    def __init__(self, out, headers):
+        self.writer = csv.writer(out)
+        self.writer.writerow(headers)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+# Writer for one JSON object per line
+class JsonlWriter:
+    def __init__(self, out, headers):
+        self.out = out
+        self.headers = headers
+
+    def write(self, row):
+        self.out.write(json.dumps(dict(zip(self.headers, row))) + "\n")
+
+    def close(self):
+        pass
+
+# Writer for a psql-style text table. Column widths are fixed up front
+# instead of measured over the whole result, so rows print as they arrive.
+class TableWriter:
+    def __init__(self, out, headers, width=TABLE_COLUMN_WIDTH):
+        self.out = out
+        self.width = width
+        self.border = "+" + "+".join("-" * (width + 2) for _ in headers) + "+\n"
+        self.out.write(self.border)
+        self.write(headers)
+        self.out.write(self.border)
+
+    def cell(self, value):
+        text = " ".join(str(value).split())
+        if len(text) > self.width:
+            text = text[:self.width - 3] + "..."
+        return text.ljust(self.width)
+
+    def write(self, row):
+        self.out.write("| " + " | ".join(self.cell(value) for value in row) + " |\n")
+
+    def close(self):
+        self.out.write(self.border)
 
-# Fetch the results
-results = query_job.result()
+WRITERS = {"csv": CsvWriter, "jsonl": JsonlWriter, "table": TableWriter}
 
-# Convert results to a DataFrame
-rows = [dict(row) for row in results]
-df = pd.DataFrame(rows)
+# Function to write the report, flushing after every page of rows
+def write_report(rows, out, output_format, sentence_count, page_size):
+    headers = ["word"] + [f"sentence{i}" for i in range(1, sentence_count + 1)]
+    writer = WRITERS[output_format](out, headers)
+    count = 0
+    for row in rows:
+        writer.write(row)
+        count += 1
+        if count % page_size == 0:
+            out.flush()
+    writer.close()
+    out.flush()
+    return count
 
-# Split the sentences array into separate columns
-df[['sentence1', 'sentence2', 'sentence3']] = pd.DataFrame(df['sentences'].tolist(), index=df.index)
+def main():
+    parser = argparse.ArgumentParser(description="Report the first sentences recorded for each word.")
+    parser.add_argument("--table", default=TABLE_ID, help="Fully qualified source table")
+    parser.add_argument("--sentence-count", type=int, default=SENTENCE_COUNT, help="Sentences per word")
+    parser.add_argument("--format", choices=sorted(WRITERS), default="table", help="Output format")
+    parser.add_argument("--output", help="Write to this file instead of stdout")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Rows fetched per result page")
+    args = parser.parse_args()
+    if args.sentence_count < 1:
+        parser.error("--sentence-count must be at least 1")
 
-# Drop the original sentences column
-df.drop(columns=['sentences'], inplace=True)
+    # Initialize the BigQuery client
+    client = bigquery.Client(project=PROJECT_ID)
+    rows = report_rows(client, args.table, args.sentence_count, args.page_size)
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as out:
+            count = write_report(rows, out, args.format, args.sentence_count, args.page_size)
+        print(f"Wrote {count} words to {args.output}")
+    else:
+        write_report(rows, sys.stdout, args.format, args.sentence_count, args.page_size)
 
-# Print the DataFrame as a table using tabulate
-print(tabulate(df, headers='keys', tablefmt='psql', showindex=False))
+if __name__ == "__main__":
+    main()